@@ -19,6 +19,7 @@ setuptools.setup(name='lifted-pddl',
       ],
       keywords='automated_planning PDDL parser',
       install_requires=['tarski'],
+      extras_require={'numpy': ['numpy']},
       include_package_data=True,
       entry_points={
           'console_scripts': [
@@ -3,6 +3,11 @@
 __version__ = "1.2.7"
 
 from lifted_pddl.parser import Parser
+from lifted_pddl.task import Task
+from lifted_pddl.shared_task import SharedTask, encode_task
+from lifted_pddl.action_index import GroundActionIndex
+from lifted_pddl.graph_encoder import StateGraphEncoder
+from lifted_pddl.heuristics import RelaxedHeuristic
 
 
 
@@ -0,0 +1,118 @@
+try:
+	import numpy as np
+except ImportError: # NumPy is an optional dependency, only needed for the applicability masks
+	np = None
+
+"""
+This class implements a bijection between the ground actions of a task, represented as tuples (action_name, var_assign), and dense integer
+ids (0, 1, 2, ...), so that the actions of a planning problem can be used as a fixed discrete action space (e.g., in reinforcement learning).
+It also obtains the applicable actions at a state as a NumPy boolean mask over the action ids.
+
+The index can be built in two ways:
+	- Lazily (GroundActionIndex(task)): ground actions are given a new id the first time they are seen (e.g., when they are applicable at a
+	  state passed to get_mask()). Therefore, the number of actions (and the length of the masks) can grow over time.
+	- From a reachability analysis (GroundActionIndex.from_reachability(task)): all the ground actions which are reachable in the delete
+	  relaxation of the task are indexed beforehand. Since they are a superset of the actions which can ever be applicable, the number of
+	  actions does not change afterwards.
+
+@task A Task (or SharedTask), as returned by Parser.compile_task(). States are passed as sets (or frozensets) of atoms.
+"""
+class GroundActionIndex:
+
+	def __init__(self, task, ground_actions=()):
+		self.task = task
+		self._actions = [] # Ground action corresponding to each id
+		self._ids = dict() # Maps each ground action to its id
+
+		for action_name, var_assign in ground_actions:
+			self.get_id(action_name, var_assign)
+
+	"""
+	Returns a GroundActionIndex which contains all the ground actions reachable from the initial state of @task in its delete relaxation
+	(i.e., ignoring delete effects and negative preconditions), sorted by action name and variable assignment.
+	"""
+	@classmethod
+	def from_reachability(cls, task):
+		_, reachable_actions = task._get_relaxed_reachability(task.init)
+
+		ground_actions = sorted([(action_name, var_assign) for action_name, var_assigns in reachable_actions.items() for var_assign in var_assigns])
+
+		return cls(task, ground_actions)
+
+	# Number of ground actions in the index
+	def __len__(self):
+		return len(self._actions)
+
+	def __contains__(self, ground_action):
+		action_name, var_assign = ground_action
+		return (action_name, tuple(var_assign)) in self._ids
+
+	# Returns the id of the ground action given by @action_name and @var_assign. If it is not in the index yet, it is given a new id.
+	def get_id(self, action_name, var_assign):
+		ground_action = (action_name, tuple(var_assign))
+		action_id = self._ids.get(ground_action)
+
+		if action_id is None:
+			action_id = len(self._actions)
+			self._ids[ground_action] = action_id
+			self._actions.append(ground_action)
+
+		return action_id
+
+	# Returns the ground action, as a tuple (action_name, var_assign), whose id is @action_id
+	def get_action(self, action_id):
+		return self._actions[action_id]
+
+	# Returns a list with the ids of the actions applicable at @state
+	def get_applicable_ids(self, state):
+		get_id = self.get_id
+
+		return [get_id(action_name, var_assign) for action_name, var_assigns in self.task.get_applicable_actions(state).items() for var_assign in var_assigns]
+
+	"""
+	Returns the applicability mask at @state, as a NumPy boolean array where the i-th element is True if the action with id i is applicable.
+	<Note>: if the index was built lazily, applicable actions not seen before are added to the index before obtaining the mask.
+	"""
+	def get_mask(self, state):
+		_check_numpy()
+
+		applicable_ids = self.get_applicable_ids(state)
+		mask = np.zeros(len(self._actions), dtype=bool)
+		mask[applicable_ids] = True
+
+		return mask
+
+	"""
+	Batched version of get_mask(). It receives a sequence of states and returns a NumPy boolean array of shape (len(states), len(self)),
+	where the i-th row is the applicability mask of the i-th state.
+	"""
+	def get_masks(self, states):
+		_check_numpy()
+
+		applicable_ids = [self.get_applicable_ids(state) for state in states]
+		masks = np.zeros((len(applicable_ids), len(self._actions)), dtype=bool) # The masks are built after obtaining all the ids, since the index can grow
+
+		for state_ind, state_applicable_ids in enumerate(applicable_ids):
+			masks[state_ind, state_applicable_ids] = True
+
+		return masks
+
+	"""
+	Returns the state resulting from applying the action with id @action_id at @state (see Task.get_next_state()).
+	"""
+	def get_next_state(self, state, action_id, check_action_applicability=True):
+		action_name, var_assign = self._actions[action_id]
+
+		return self.task.get_next_state(state, action_name, var_assign, check_action_applicability)
+
+	"""
+	Batched version of get_next_state(). It receives a sequence of states and a sequence (e.g., a NumPy array) with the id of the action
+	to apply at each state, and returns a list with the next states.
+	"""
+	def get_next_states(self, states, action_ids, check_action_applicability=True):
+		return [self.get_next_state(state, int(action_id), check_action_applicability) for state, action_id in zip(states, action_ids)]
+
+# Raises an ImportError if NumPy is not installed
+def _check_numpy():
+	if np is None:
+		raise ImportError("NumPy is required to obtain applicability masks. Install it with 'pip install numpy'")
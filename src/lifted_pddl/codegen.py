@@ -0,0 +1,421 @@
+import hashlib
+import importlib.util
+import os
+import sys
+import types
+
+from lifted_pddl.utils import get_bind_vars
+
+"""
+Generation of specialized Python code for the action schemas of a domain.
+
+The generic successor generator (_SuccessorGenerator._get_applicable_var_assigns_action) interprets the precondition tuples of an action
+schema every time it is called. Instead, for each action schema we generate (and exec) the source code of three functions:
+	- A matcher, which obtains the applicable variable assignments of the schema at a state. The preconditions are joined in the
+	  same order as the generic successor generator, but the join is unrolled into nested loops over the atoms of each predicate, whose
+	  variables are local variables (v0, v1, ...). Preconditions with variables already bound are looked up in hash indexes instead of
+	  compared against every atom, and the type checks, negative preconditions and existential preconditions (as a semi-join which stops
+	  at the first witness) are inlined.
+	- A checker, which returns whether a ground action of the schema is applicable at a state. It is generated in the same way as the
+	  matcher, but with the parameters bound from the start, so that only the existential preconditions need to be joined.
+	- An effect function, which applies the add and delete effects of a ground action to a state.
+
+The generated code only depends on the action schemas and the type hierarchy (object types are passed as arguments), so it is cached
+by the hash of the domain: in memory for the current process and, if a cache directory is given, as a Python module stored in that
+directory, which is reused (together with its compiled bytecode) by later runs.
+"""
+
+_CODEGEN_VERSION = 3 # Must be increased whenever the generated code changes, so that modules cached on disk are not reused
+_MAX_NESTED_LOOPS = 18 # Python does not allow more than 20 statically nested blocks
+
+_compiled_modules = dict() # Maps each domain hash to its compiled module (cache for the current process)
+
+"""
+Returns the compiled module with the code generated for the action schemas @actions (in the format of Parser.actions) and the type
+hierarchy @type_hierarchy. The module contains:
+	- MATCHERS: dictionary which maps each action name to its matcher, a function (atoms, atoms_by_pred, object_types, objects_by_type)
+	  which returns the applicable variable assignments of the action schema at @atoms, in the same format as
+	  _get_applicable_var_assigns_action(). atoms_by_pred is the dictionary returned by get_atoms_by_pred(@atoms) and objects_by_type maps
+	  each type to the list of objects of exactly that type. If the matcher of an action could not be generated (it would need too many
+	  nested loops), it is None.
+	- CHECKERS: dictionary which maps each action name to its checker, a function (atoms, var_assign, object_types, objects_by_type) which
+	  returns True if the ground action given by @var_assign is applicable at @atoms, as _SuccessorGenerator._is_action_applicable().
+	  As for MATCHERS, it is None if the checker could not be generated.
+	- APPLY_EFFECTS: dictionary which maps each action name to a function (atoms, var_assign) which returns the set of atoms resulting
+	  from applying the effects of the ground action to @atoms (without checking its applicability). @atoms is not modified.
+	- get_atoms_by_pred(atoms): function which returns a dictionary mapping each predicate appearing in the positive preconditions to
+	  the list with the objects of its atoms.
+
+@cache_dir If not None, the generated module is stored in (and loaded from) this directory, so that it is reused across runs.
+"""
+def compile_actions(actions, type_hierarchy, cache_dir=None):
+	domain_hash = get_domain_hash(actions, type_hierarchy)
+	module = _compiled_modules.get(domain_hash)
+
+	if module is not None:
+		return module
+
+	module_name = 'lifted_pddl_actions_' + domain_hash
+
+	if cache_dir is None:
+		module = types.ModuleType(module_name)
+		exec(compile(generate_actions_source(actions, type_hierarchy), '<{}>'.format(module_name), 'exec'), module.__dict__)
+	else:
+		module_path = os.path.join(cache_dir, module_name + '.py')
+
+		if not os.path.exists(module_path):
+			os.makedirs(cache_dir, exist_ok=True)
+
+			# The module is written to a temporary file first, so that other processes never load a partially written module
+			tmp_path = '{}.{}.tmp'.format(module_path, os.getpid())
+			with open(tmp_path, 'w') as f:
+				f.write(generate_actions_source(actions, type_hierarchy))
+			os.replace(tmp_path, module_path)
+
+		spec = importlib.util.spec_from_file_location(module_name, module_path)
+		module = importlib.util.module_from_spec(spec)
+		spec.loader.exec_module(module)
+
+	_compiled_modules[domain_hash] = module
+
+	return module
+
+# Returns the hash (hex string) which identifies the code generated for @actions and @type_hierarchy
+def get_domain_hash(actions, type_hierarchy):
+	domain_repr = repr((_CODEGEN_VERSION, sys.version_info[:2], sorted(actions),
+						sorted([(parent, sorted(children)) for parent, children in type_hierarchy.items()])))
+
+	return hashlib.sha256(domain_repr.encode('utf-8')).hexdigest()
+
+# Returns the source code of the module described in compile_actions()
+def generate_actions_source(actions, type_hierarchy):
+	actions = sorted(actions)
+	type_consts = dict() # Maps each set of allowed types to the name of the module constant which contains it
+
+	functions = []
+	matcher_names = []
+	checker_names = []
+	effect_names = []
+
+	for action_ind, action in enumerate(actions):
+		matcher_source = _generate_matcher('_match_{}'.format(action_ind), action, type_hierarchy, type_consts)
+
+		if matcher_source is not None:
+			functions.append(matcher_source)
+			matcher_names.append('_match_{}'.format(action_ind))
+		else:
+			matcher_names.append('None')
+
+		checker_source = _generate_matcher('_check_{}'.format(action_ind), action, type_hierarchy, type_consts, is_checker=True)
+
+		if checker_source is not None:
+			functions.append(checker_source)
+			checker_names.append('_check_{}'.format(action_ind))
+		else:
+			checker_names.append('None')
+
+		functions.append(_generate_effects('_apply_{}'.format(action_ind), action))
+		effect_names.append('_apply_{}'.format(action_ind))
+
+	precond_preds = sorted(set([precond[1] for action in actions for precond in action[2] if precond[0] and len(precond[2]) > 0]))
+
+	lines = ['# Code generated by lifted_pddl.codegen for the action schemas of a domain. Do not edit.', '']
+	lines.extend(['{} = frozenset({!r})'.format(const_name, sorted(allowed_types)) for allowed_types, const_name in type_consts.items()])
+	lines.append('')
+
+	for function in functions:
+		lines.extend(['', function])
+
+	lines.extend(['', 'MATCHERS = {' + ', '.join(['{!r}: {}'.format(action[0], name) for action, name in zip(actions, matcher_names)]) + '}',
+				  'CHECKERS = {' + ', '.join(['{!r}: {}'.format(action[0], name) for action, name in zip(actions, checker_names)]) + '}',
+				  'APPLY_EFFECTS = {' + ', '.join(['{!r}: {}'.format(action[0], name) for action, name in zip(actions, effect_names)]) + '}',
+				  '', '',
+				  'def get_atoms_by_pred(atoms):',
+				  '\tatoms_by_pred = {' + ', '.join(['{!r}: []'.format(pred_name) for pred_name in precond_preds]) + '}',
+				  '\tfor pred_name, obj_inds in atoms:',
+				  '\t\tpred_atoms = atoms_by_pred.get(pred_name)',
+				  '\t\tif pred_atoms is not None:',
+				  '\t\t\tpred_atoms.append(obj_inds)',
+				  '\treturn atoms_by_pred', ''])
+
+	return '\n'.join(lines)
+
+# Returns the source code of a tuple with the variables @var_inds, e.g., '(v0, v2)' or '(v1,)'
+def _get_tuple_source(var_inds):
+	var_names = ['v{}'.format(var) for var in var_inds]
+	return '(' + ', '.join(var_names) + (',)' if len(var_names) == 1 else ')')
+
+"""
+Auxiliary function used by generate_actions_source. It returns the source code of the matcher of @action (see compile_actions()),
+or None if it needs more than _MAX_NESTED_LOOPS nested loops.
+The joins follow the same steps as _SuccessorGenerator._get_applicable_var_assigns_action (and _get_var_assigns_semi_join for the
+preconditions with existential variables), so that both return the same variable assignments.
+
+@is_checker If True, the source code of the checker of @action is returned instead. The parameters are bound to the objects of
+			var_assign (after checking their types), so the preconditions over parameters become lookups in the state and the function
+			returns as soon as a witness of the existential preconditions is found.
+"""
+def _generate_matcher(function_name, action, type_hierarchy, type_consts, is_checker=False):
+	action_name, (action_vars, vars_class), preconds, _ = action
+	num_params = vars_class.count('param')
+
+	def get_type_const(var):
+		allowed_types = frozenset(type_hierarchy[action_vars[var]])
+		if allowed_types not in type_consts:
+			type_consts[allowed_types] = '_TYPES_{}'.format(len(type_consts))
+		return type_consts[allowed_types]
+
+	# Split the preconditions in the same way as _get_applicable_var_assigns_action
+	nullary_preconds = [precond for precond in preconds if len(precond[2]) == 0]
+	preconds = [precond for precond in preconds if len(precond[2]) > 0]
+	positive_preconds = [precond for precond in preconds if precond[0]]
+	negative_preconds = [precond for precond in preconds if not precond[0]]
+
+	exists_vars = set([var for var, var_class in enumerate(vars_class) if var_class == 'exists'])
+	exists_positive_preconds = [precond for precond in positive_preconds if not exists_vars.isdisjoint(precond[2])]
+	positive_preconds = [precond for precond in positive_preconds if exists_vars.isdisjoint(precond[2])]
+	semi_join_vars = set([var for precond in exists_positive_preconds for var in precond[2]]) | exists_vars
+
+	# <Join steps>
+	# Each step is a tuple (precond, key_positions) for preconditions, or (None, var) for free variables.
+	# A free variable repeated in a precondition must contain the same object in all its occurrences (as in the generic join).
+	# In a checker, the parameters are already bound.
+	is_var_bound = [is_checker and var_class == 'param' for var_class in vars_class]
+	steps = []
+
+	for precond in positive_preconds if not is_checker else ():
+		steps.append((precond, tuple([pos for pos, var in enumerate(precond[2]) if is_var_bound[var]])))
+		for var in precond[2]:
+			is_var_bound[var] = True
+
+	remaining_negative_preconds = [precond for precond in negative_preconds if not all(is_var_bound[var] for var in precond[2])]
+	negative_precond_vars = set([var for precond in remaining_negative_preconds for var in precond[2]])
+	free_vars = [var for var, is_bound in enumerate(is_var_bound) if not is_bound and var not in semi_join_vars]
+	free_vars.sort(key=lambda var: var not in negative_precond_vars)
+
+	for var in free_vars:
+		steps.append((None, var))
+		is_var_bound[var] = True
+
+	params_bound_step = None # Index of the first semi-join step executed with all the parameters bound
+
+	if len(exists_vars) > 0:
+		for precond in exists_positive_preconds:
+			if params_bound_step is None and all(is_var_bound[:num_params]):
+				params_bound_step = len(steps)
+			steps.append((precond, tuple([pos for pos, var in enumerate(precond[2]) if is_var_bound[var]])))
+			for var in precond[2]:
+				is_var_bound[var] = True
+
+		for var, is_bound in enumerate(is_var_bound):
+			if not is_bound:
+				if params_bound_step is None and all(is_var_bound[:num_params]):
+					params_bound_step = len(steps)
+				steps.append((None, var))
+				is_var_bound[var] = True
+
+		if params_bound_step is None:
+			params_bound_step = len(steps)
+
+	if len(steps) > _MAX_NESTED_LOOPS:
+		return None
+
+	# <Function header>
+	empty_result = 'False' if is_checker else '()'
+
+	if not is_checker:
+		lines = ['# {}'.format(action_name), 'def {}(atoms, atoms_by_pred, object_types, objects_by_type):'.format(function_name)]
+		rows_preds = set([precond[1] for precond in positive_preconds + exists_positive_preconds])
+	else:
+		lines = ['# {}'.format(action_name), 'def {}(atoms, var_assign, object_types, objects_by_type):'.format(function_name)]
+		lines.append('\tassert len(var_assign) == {}, "The number of variables in var_assign must be the same that the name of action parameters."' \
+					 .format(num_params))
+
+		if num_params > 0:
+			lines.append('\t{} = var_assign'.format(_get_tuple_source(range(num_params))))
+			lines.append('\tif {}:'.format(' or '.join(['object_types[v{}] not in {}'.format(var, get_type_const(var)) for var in range(num_params)])))
+			lines.append('\t\treturn False')
+
+		# Only the preconditions with unbound variables need the atoms grouped by predicate
+		rows_preds = set([step[0][1] for step in steps if step[0] is not None and len(step[1]) < len(step[0][2])])
+
+	for precond in nullary_preconds:
+		lines.append('\tif {!r} not in atoms:'.format(precond[1:]))
+		lines.append('\t\treturn {}'.format(empty_result))
+
+	if is_checker:
+		# Preconditions over parameters (in a checker, all the preconditions without existential variables), checked before the joins
+		for precond in positive_preconds:
+			lines.append('\tif ({!r}, {}) not in atoms:'.format(precond[1], _get_tuple_source(precond[2])))
+			lines.append('\t\treturn False')
+
+		for precond in negative_preconds:
+			if all(var < num_params for var in precond[2]):
+				lines.append('\tif ({!r}, {}) in atoms:'.format(precond[1], _get_tuple_source(precond[2])))
+				lines.append('\t\treturn False')
+
+		negative_preconds = [precond for precond in negative_preconds if not all(var < num_params for var in precond[2])]
+
+		if len(rows_preds) > 0:
+			lines.append('\tatoms_by_pred = get_atoms_by_pred(atoms)')
+
+	for pred_name in sorted(rows_preds):
+		lines.append('\tif not atoms_by_pred[{!r}]:'.format(pred_name))
+		lines.append('\t\treturn {}'.format(empty_result))
+
+	# Build the rows (or index) of each precondition step, discarding the atoms with objects of the wrong type
+	is_var_bound = [False]*len(action_vars)
+	step_infos = [] # For each step, (rows_name, key_vars, bind_positions) or None for free variables and fully bound preconditions
+
+	for step_ind, step in enumerate(steps):
+		if step[0] is None:
+			step_infos.append(None)
+			is_var_bound[step[1]] = True
+			continue
+
+		(_, precond_pred, precond_vars), key_positions = step
+
+		if len(key_positions) == len(precond_vars): # All the variables are bound: the atom is looked up in the state
+			step_infos.append(None)
+			continue
+
+		free_positions = [pos for pos in range(len(precond_vars)) if pos not in key_positions]
+		conditions = ['object_types[obj_inds[{}]] in {}'.format(pos, get_type_const(precond_vars[pos])) for pos in free_positions]
+
+		bind_vars, dup_positions = get_bind_vars(precond_vars, key_positions)
+		bind_positions = [pos for pos, _ in bind_vars]
+		conditions.extend(['obj_inds[{}] == obj_inds[{}]'.format(pos, first_pos) for pos, first_pos in dup_positions])
+
+		rows_name = 'rows_{}'.format(step_ind)
+		condition = ' and '.join(conditions)
+
+		if len(key_positions) == 0:
+			if len(conditions) == 0:
+				lines.append('\t{} = atoms_by_pred[{!r}]'.format(rows_name, precond_pred))
+			else:
+				lines.append('\t{} = [obj_inds for obj_inds in atoms_by_pred[{!r}] if {}]'.format(rows_name, precond_pred, condition))
+		else:
+			key_source = 'obj_inds[{}]'.format(key_positions[0]) if len(key_positions) == 1 else \
+						 '(' + ', '.join(['obj_inds[{}]'.format(pos) for pos in key_positions]) + ')'
+			lines.append('\t{} = dict()'.format(rows_name))
+			lines.append('\tfor obj_inds in atoms_by_pred[{!r}]:'.format(precond_pred))
+			indent = '\t\t'
+			if len(conditions) > 0:
+				lines.append('\t\tif {}:'.format(condition))
+				indent = '\t\t\t'
+			lines.append('{}key = {}'.format(indent, key_source))
+			lines.append('{}if key in {}:'.format(indent, rows_name))
+			lines.append('{}\t{}[key].append(obj_inds)'.format(indent, rows_name))
+			lines.append('{}else:'.format(indent))
+			lines.append('{}\t{}[key] = [obj_inds]'.format(indent, rows_name))
+
+		key_vars = [precond_vars[pos] for pos in key_positions]
+		step_infos.append((rows_name, key_vars, bind_positions))
+
+	# <Nested loops>
+	# Returns the lines of the loops of steps[first_step:last_step], starting with indentation @indent, the negative preconditions not checked
+	# yet and the indentation of the innermost loop body
+	def get_loop_lines(first_step, last_step, is_var_bound, negative_preconds, indent):
+		loop_lines = []
+
+		for step_ind in range(first_step, last_step):
+			step = steps[step_ind]
+
+			if step[0] is None:
+				var = step[1]
+				loop_lines.append('{}for v{} in objects_by_type.get({!r}, ()):'.format(indent, var, action_vars[var]))
+				is_var_bound[var] = True
+			else:
+				(_, precond_pred, precond_vars), key_positions = step
+
+				if step_infos[step_ind] is None:
+					loop_lines.append('{}if ({!r}, {}) in atoms:'.format(indent, precond_pred, _get_tuple_source(precond_vars)))
+				else:
+					rows_name, key_vars, bind_positions = step_infos[step_ind]
+					row_name = 'row_{}'.format(step_ind)
+
+					if len(key_vars) == 0:
+						loop_lines.append('{}for {} in {}:'.format(indent, row_name, rows_name))
+					else:
+						key_source = 'v{}'.format(key_vars[0]) if len(key_vars) == 1 else _get_tuple_source(key_vars)
+						loop_lines.append('{}for {} in {}.get({}, ()):'.format(indent, row_name, rows_name, key_source))
+
+					for pos in bind_positions:
+						loop_lines.append('{}\tv{} = {}[{}]'.format(indent, precond_vars[pos], row_name, pos))
+
+				for var in precond_vars:
+					is_var_bound[var] = True
+
+			indent += '\t'
+
+			# Negative preconditions whose variables have just been bound
+			checked_preconds = [precond for precond in negative_preconds if all(is_var_bound[var] for var in precond[2])]
+			negative_preconds = [precond for precond in negative_preconds if precond not in checked_preconds]
+
+			if len(checked_preconds) > 0:
+				loop_lines.append('{}if {}:'.format(indent, ' and '.join(['({!r}, {}) not in atoms'.format(precond[1], _get_tuple_source(precond[2])) \
+																		 for precond in checked_preconds])))
+				indent += '\t'
+
+		return loop_lines, negative_preconds, indent
+
+	if is_checker:
+		loop_lines, _, indent = get_loop_lines(0, len(steps), [var_class == 'param' for var_class in vars_class], negative_preconds, '\t')
+		lines.extend(loop_lines)
+		lines.append('{}return True'.format(indent))
+
+		if len(loop_lines) > 0:
+			lines.append('\treturn False')
+
+		return '\n'.join(lines)
+
+	if len(exists_vars) == 0:
+		loop_lines, _, indent = get_loop_lines(0, len(steps), [False]*len(action_vars), negative_preconds, '\t')
+		lines.append('\tresult = []')
+		lines.extend(loop_lines)
+		lines.append('{}result.append({})'.format(indent, _get_tuple_source(range(len(action_vars)))))
+	else:
+		# The steps after params_bound_step only look for the first witness of the parameter assignment, in a nested function
+		is_var_bound = [False]*len(action_vars)
+		outer_lines, remaining_negative_preconds, indent = get_loop_lines(0, params_bound_step, is_var_bound, negative_preconds, '\t')
+		bound_vars = ', '.join(['v{}'.format(var) for var, is_bound in enumerate(is_var_bound) if is_bound])
+		condition = 'param_assign not in found_param_assigns'
+
+		if params_bound_step < len(steps):
+			witness_lines, _, witness_indent = get_loop_lines(params_bound_step, len(steps), is_var_bound.copy(), remaining_negative_preconds, '\t\t')
+			lines.append('\tdef has_witness({}):'.format(bound_vars))
+			lines.extend(witness_lines)
+			lines.append('{}return True'.format(witness_indent))
+			lines.append('\t\treturn False')
+			condition += ' and has_witness({})'.format(bound_vars)
+
+		lines.append('\tresult = []')
+		lines.append('\tfound_param_assigns = set()')
+		lines.extend(outer_lines)
+		lines.append('{}param_assign = {}'.format(indent, _get_tuple_source(range(num_params))))
+		lines.append('{}if {}:'.format(indent, condition))
+		lines.append('{}\tfound_param_assigns.add(param_assign)'.format(indent))
+		lines.append('{}\tresult.append(param_assign)'.format(indent))
+
+	lines.append('\treturn tuple(result)')
+
+	return '\n'.join(lines)
+
+"""
+Auxiliary function used by generate_actions_source. It returns the source code of the effect function of @action (see compile_actions()),
+which applies its effects in the same order as _SuccessorGenerator._get_next_state.
+"""
+def _generate_effects(function_name, action):
+	action_name, _, _, effects = action
+	effect_vars = sorted(set([var for effect in effects for var in effect[2]]))
+
+	lines = ['# {}'.format(action_name), 'def {}(atoms, var_assign):'.format(function_name)]
+	lines.extend(['\tv{0} = var_assign[{0}]'.format(var) for var in effect_vars])
+	lines.append('\tnew_atoms = set(atoms)')
+
+	for is_add_effect, pred_name, var_inds in effects:
+		lines.append('\tnew_atoms.{}(({!r}, {}))'.format('add' if is_add_effect else 'discard', pred_name, _get_tuple_source(var_inds)))
+
+	lines.append('\treturn new_atoms')
+
+	return '\n'.join(lines)
@@ -0,0 +1,257 @@
+from itertools import chain, islice
+import json
+import os
+import shutil
+
+from lifted_pddl.shared_task import SharedTask
+
+try:
+	import numpy as np
+except ImportError: # NumPy is an optional dependency, only needed to encode states as arrays
+	np = None
+
+"""
+This class encodes batches of states of a task as NumPy arrays, in the object-graph representation used by graph neural networks
+(each object is a node and each atom a (hyper)edge between the objects it contains). It receives a Task (or SharedTask), as returned
+by Parser.compile_task(), and the encoded arrays are:
+	- 'node_types': type id of each object (int32 array of shape (num_objects,)). Type ids are the indexes of self.type_names.
+	- 'node_type_mask': boolean array of shape (num_objects, num_types), True if the object belongs to the type (or one of its subtypes).
+	- 'goal_mask': boolean array of shape (num_states, num_goals), True if the goal self.goals[j] is satisfied at the i-th state.
+	- 'atoms': dictionary which maps each predicate name to a dictionary with the atoms of that predicate in all the states:
+		- 'objects': objects of each atom (int32 array of shape (num_atoms, predicate_arity))
+		- 'state_inds': index (in the batch) of the state each atom belongs to (int32 array of shape (num_atoms,))
+		- 'offsets': the atoms of the i-th state are in rows offsets[i]:offsets[i+1] (int64 array of shape (num_states+1,))
+		- 'is_goal': True if the atom is a positive goal (boolean array of shape (num_atoms,))
+
+The states are consumed in chunks, whose atoms are converted to NumPy arrays at once (instead of state by state) and appended to the
+arrays, so only one chunk of states is kept in memory even if the states are given by a generator. If a directory is given, the arrays
+are written as .npy files inside it (instead of in memory) and returned memory-mapped, so that datasets larger than the available memory
+can be written.
+
+Example:
+	encoder = StateGraphEncoder(task)
+	batch = encoder.encode(states) # Or encoder.encode(states, 'dataset_dir') and later StateGraphEncoder.load('dataset_dir')
+	at_objects = batch['atoms']['at']['objects']
+"""
+class StateGraphEncoder:
+
+	def __init__(self, task):
+		_check_numpy()
+
+		self.task = task
+
+		# SharedTask represents types by their type ids (their index in the sorted list of types) instead of their names
+		if isinstance(task, SharedTask):
+			object_types = [task.types[obj_type] for obj_type in task.object_types]
+			type_hierarchy = {task.types[parent] : [task.types[child] for child in children] for parent, children in task.type_hierarchy.items()}
+		else:
+			object_types = task.object_types
+			type_hierarchy = task.type_hierarchy
+
+		self.type_names = tuple(sorted(task.types))
+		type_ids = {type_name : type_id for type_id, type_name in enumerate(self.type_names)}
+
+		self.node_types = np.array([type_ids[obj_type] for obj_type in object_types], dtype=np.int32)
+		self.node_type_mask = np.zeros((len(self.node_types), len(self.type_names)), dtype=bool)
+
+		for parent, children in type_hierarchy.items():
+			self.node_type_mask[:, type_ids[parent]] = np.isin(self.node_types, [type_ids[child] for child in children])
+
+		# Predicates and goals are sorted so that the encoding does not depend on the order of the sets
+		self.predicate_names = tuple(sorted([pred_name for pred_name, _ in task.predicates]))
+		self.predicate_arities = {pred_name : len(pred_types) for pred_name, pred_types in task.predicates}
+		self.goals = tuple(sorted(task.goals))
+
+		# Objects of the positive goals of each predicate, used to obtain the is_goal arrays
+		self._goal_objects = {pred_name : [] for pred_name in self.predicate_names}
+
+		for is_true, pred_name, obj_inds in self.goals:
+			if is_true:
+				self._goal_objects[pred_name].append(obj_inds)
+
+	"""
+	Encodes the states in @states (an iterable of sets or frozensets of atoms, e.g., a list or a generator) and returns a dictionary with
+	the arrays described above.
+	If @directory is not None, the arrays are stored as .npy files inside it (which is created if it does not exist) and the returned
+	arrays are memory-mapped to these files.
+	@chunk_size Number of states which are read from @states and whose atoms are collected in Python lists before appending them to the arrays.
+	"""
+	def encode(self, states, directory=None, chunk_size=10000):
+		pred_names = self.predicate_names
+		pred_arities = self.predicate_arities
+
+		if directory is not None:
+			os.makedirs(directory, exist_ok=True)
+
+		new_array = _ArrayAllocator(directory)
+		encoded = {'node_types': new_array('node_types', self.node_types.shape, np.int32),
+				   'node_type_mask': new_array('node_type_mask', self.node_type_mask.shape, bool)}
+		encoded['node_types'][:] = self.node_types
+		encoded['node_type_mask'][:] = self.node_type_mask
+
+		# The number of states and atoms is not known in advance, so the rest of arrays are appended chunk by chunk
+		goal_mask = new_array.appendable('goal_mask', (len(self.goals),), bool)
+		pred_arrays = {pred_name : {'objects': new_array.appendable(pred_name + '.objects', (pred_arities[pred_name],), np.int32),
+									'state_inds': new_array.appendable(pred_name + '.state_inds', (), np.int32),
+									'offsets': new_array.appendable(pred_name + '.offsets', (), np.int64),
+									'is_goal': new_array.appendable(pred_name + '.is_goal', (), bool)}
+					   for pred_name in pred_names}
+
+		for arrays in pred_arrays.values():
+			arrays['offsets'].append(np.zeros(1, dtype=np.int64))
+
+		goal_atoms = [(pred_name, obj_inds) for _, pred_name, obj_inds in self.goals]
+		goal_values = np.array([is_true for is_true, _, _ in self.goals], dtype=bool)
+		num_atoms = {pred_name : 0 for pred_name in pred_names}
+		num_states = 0
+		states = iter(states)
+
+		# Encode the states, chunk by chunk
+		while True:
+			chunk = list(islice(states, chunk_size))
+
+			if len(chunk) == 0:
+				break
+
+			chunk_objects = {pred_name : [] for pred_name in pred_names}
+			chunk_state_inds = {pred_name : [] for pred_name in pred_names} # Index of the state (in the chunk) of each atom
+
+			for state_ind, state in enumerate(chunk):
+				for pred_name, obj_inds in state:
+					chunk_objects[pred_name].append(obj_inds)
+					chunk_state_inds[pred_name].append(state_ind)
+
+			for pred_name, objects in chunk_objects.items():
+				arity = pred_arities[pred_name]
+				arrays = pred_arrays[pred_name]
+
+				objects_array = np.fromiter(chain.from_iterable(objects), dtype=np.int32, count=len(objects)*arity).reshape(len(objects), arity)
+				state_inds = np.array(chunk_state_inds[pred_name], dtype=np.int32)
+				pred_counts = np.bincount(state_inds, minlength=len(chunk))
+
+				arrays['objects'].append(objects_array)
+				arrays['state_inds'].append(state_inds + num_states)
+				arrays['offsets'].append(num_atoms[pred_name] + np.cumsum(pred_counts, dtype=np.int64))
+				arrays['is_goal'].append(_isin_rows(objects_array, self._goal_objects[pred_name], arity))
+				num_atoms[pred_name] += len(objects)
+
+			# A goal is satisfied if its atom is in the state and it is positive, or its atom is not in the state and it is negative
+			chunk_goal_mask = np.fromiter(chain.from_iterable([atom in state for atom in goal_atoms] for state in chunk), dtype=bool,
+										  count=len(chunk)*len(goal_atoms)).reshape(len(chunk), len(goal_atoms))
+			goal_mask.append(chunk_goal_mask == goal_values)
+
+			num_states += len(chunk)
+
+		encoded['goal_mask'] = goal_mask.finish()
+		encoded['atoms'] = {pred_name : {array_name : array.finish() for array_name, array in arrays.items()} for pred_name, arrays in pred_arrays.items()}
+
+		if directory is not None:
+			encoded['node_types'].flush()
+			encoded['node_type_mask'].flush()
+
+			with open(os.path.join(directory, 'metadata.json'), 'w') as f:
+				json.dump({'num_states': num_states, 'type_names': self.type_names, 'predicate_names': pred_names,
+						   'goals': self.goals}, f)
+
+		return encoded
+
+	"""
+	Loads the arrays stored by encode() in @directory, memory-mapped in read-only mode (unless @mmap_mode is given), and returns them
+	in the same format as encode().
+	"""
+	@staticmethod
+	def load(directory, mmap_mode='r'):
+		_check_numpy()
+
+		with open(os.path.join(directory, 'metadata.json')) as f:
+			metadata = json.load(f)
+
+		load_array = lambda name: np.load(os.path.join(directory, name + '.npy'), mmap_mode=mmap_mode)
+
+		return {'node_types': load_array('node_types'),
+				'node_type_mask': load_array('node_type_mask'),
+				'goal_mask': load_array('goal_mask'),
+				'atoms': {pred_name : {array_name : load_array(pred_name + '.' + array_name) for array_name in ('objects', 'state_inds', 'offsets', 'is_goal')}
+						  for pred_name in metadata['predicate_names']}}
+
+# Creates uninitialized arrays, either in memory or (if @directory is not None) as memory-mapped .npy files inside @directory
+class _ArrayAllocator:
+
+	def __init__(self, directory):
+		self.directory = directory
+
+	def __call__(self, name, shape, dtype):
+		if self.directory is None:
+			return np.empty(shape, dtype=dtype)
+		else:
+			return np.lib.format.open_memmap(os.path.join(self.directory, name + '.npy'), mode='w+', dtype=dtype, shape=shape)
+
+	# Returns an _AppendableArray whose rows have shape @row_shape
+	def appendable(self, name, row_shape, dtype):
+		return _AppendableArray(None if self.directory is None else os.path.join(self.directory, name + '.npy'), row_shape, dtype)
+
+"""
+Array whose length is not known in advance, since its rows are appended chunk by chunk. If @path is None, the chunks are kept in memory
+and concatenated by finish(). Otherwise, they are written to a temporary file, which finish() turns into the .npy file @path (by
+prepending the header with the final shape) and returns memory-mapped, so the chunks are never kept in memory.
+"""
+class _AppendableArray:
+
+	def __init__(self, path, row_shape, dtype):
+		self.path = path
+		self.row_shape = row_shape
+		self.dtype = np.dtype(dtype)
+		self.num_rows = 0
+
+		if path is None:
+			self._chunks = []
+		else:
+			self._file = open(path + '.tmp', 'wb')
+
+	def append(self, rows):
+		rows = np.ascontiguousarray(rows, dtype=self.dtype)
+
+		if self.path is None:
+			self._chunks.append(rows)
+		else:
+			self._file.write(rows.tobytes())
+
+		self.num_rows += len(rows)
+
+	# Returns the array with all the rows appended
+	def finish(self):
+		shape = (self.num_rows,) + self.row_shape
+
+		if self.path is None:
+			return np.concatenate(self._chunks) if len(self._chunks) > 0 else np.empty(shape, dtype=self.dtype)
+
+		self._file.close()
+
+		with open(self.path, 'wb') as f:
+			np.lib.format.write_array_header_1_0(f, {'descr': np.lib.format.dtype_to_descr(self.dtype), 'fortran_order': False, 'shape': shape})
+
+			with open(self.path + '.tmp', 'rb') as tmp_file:
+				shutil.copyfileobj(tmp_file, f)
+
+		os.remove(self.path + '.tmp')
+
+		return np.load(self.path, mmap_mode='r+')
+
+# Returns a boolean array which is True for the rows of @array (of shape (n, arity)) contained in the list of tuples @rows
+def _isin_rows(array, rows, arity):
+	if len(rows) == 0 or len(array) == 0:
+		return np.zeros(len(array), dtype=bool)
+	if arity == 0: # All the atoms of a nullary predicate are the same atom
+		return np.ones(len(array), dtype=bool)
+
+	# Each row is viewed as a single opaque element, so that rows can be compared with np.isin
+	row_dtype = np.dtype((np.void, array.dtype.itemsize*arity))
+	array_rows = np.ascontiguousarray(array).view(row_dtype).ravel()
+	other_rows = np.array(rows, dtype=array.dtype).view(row_dtype).ravel()
+
+	return np.isin(array_rows, other_rows)
+
+# Raises an ImportError if NumPy is not installed
+def _check_numpy():
+	if np is None:
+		raise ImportError("NumPy is required to encode states as arrays. Install it with 'pip install numpy'")
@@ -0,0 +1,351 @@
+from operator import itemgetter
+import heapq
+
+from lifted_pddl.utils import LRUCache, get_bind_vars
+
+"""
+This class computes delete-relaxation heuristics (h_max, h_add and h_FF) of the states of a task directly on the lifted action schemas,
+without grounding the task. It receives a Task (or SharedTask), as returned by Parser.compile_task().
+
+The heuristics are computed with a generalized Dijkstra over the atoms, where the relaxed action schemas (without delete effects
+and negative preconditions) are evaluated as Datalog rules: every time an atom obtains its final cost, it is joined with the atoms
+already reached in order to find the new ground actions whose preconditions are now all reached (semi-naive evaluation). This way,
+each ground action is only instantiated once per evaluation and only if it is reachable from the state.
+Variables introduced by existential preconditions are treated as additional parameters of the relaxed actions, so that an
+existential precondition costs as much as its cheapest witness.
+
+Everything that does not depend on the state is computed only once, when the heuristic is created: the join order of each rule,
+the atoms of static predicates (those which do not appear in any action effect, so they are the same in every state reachable from
+task.init) indexed for each join and the ground actions whose preconditions only contain static predicates. Additionally, the
+heuristic values of the last @cache_size evaluated states are cached, so that repeated states are not evaluated again.
+
+@heuristic 'max' (h_max), 'add' (h_add) or 'ff' (h_FF, the number of actions in the relaxed plan obtained from the h_add best supporters)
+All the actions have unit cost. Negative goals are ignored and unreachable goals result in a heuristic value of float('inf').
+
+Example:
+	heuristic = RelaxedHeuristic(task, 'ff')
+	h = heuristic(state)
+	relaxed_plan = heuristic.get_relaxed_plan(state) # E.g., to obtain the helpful actions
+"""
+class RelaxedHeuristic:
+
+	def __init__(self, task, heuristic='ff', cache_size=10000):
+		assert heuristic in ('max', 'add', 'ff'), "@heuristic must be 'max', 'add' or 'ff'"
+
+		self.task = task
+		self.heuristic = heuristic
+		self._cache = LRUCache(cache_size)
+
+		type_hierarchy = task.type_hierarchy
+		object_types = task.object_types
+
+		# Static predicates are those which are not modified by any action
+		fluent_preds = set([effect[1] for action in task.actions for effect in action[3]])
+		self._static_atoms = frozenset([atom for atom in task.init if atom[0] not in fluent_preds])
+		self._fluent_preds = fluent_preds
+
+		# Positive goals. Static goals are checked once, since they are either always or never satisfied
+		goal_atoms = set([(pred_name, obj_inds) for is_true, pred_name, obj_inds in task.goals if is_true])
+		self._is_static_goal_reached = all(atom in self._static_atoms for atom in goal_atoms if atom[0] not in fluent_preds)
+		self._goal_atoms = frozenset([atom for atom in goal_atoms if atom[0] in fluent_preds])
+
+		static_atoms_by_pred = dict()
+		for pred_name, obj_inds in self._static_atoms:
+			static_atoms_by_pred.setdefault(pred_name, []).append(obj_inds)
+
+		# <Rules>
+		# rules_by_pred maps each fluent predicate to the list of rules triggered by the atoms of that predicate. Each rule is a tuple
+		# (schema, delta_vars, delta_allowed_types, steps) where the atom is bound to a positive precondition of the schema with variables
+		# delta_vars, and steps are the join steps needed to bind the remaining variables (see _get_join_steps).
+		# Fluent indexes (those over atoms of fluent predicates) are rebuilt in each evaluation. fluent_indexes_by_pred maps each fluent
+		# predicate to the list of (index_id, allowed_types, key_getter, dup_positions) of the indexes over its atoms.
+		self._rules_by_pred = {pred_name : [] for pred_name in fluent_preds}
+		self._fluent_indexes_by_pred = {pred_name : [] for pred_name in fluent_preds}
+		fluent_index_ids = dict()
+		static_indexes = dict()
+
+		# Ground actions which only depend on static atoms, as tuples (schema, var_assign)
+		self._static_ground_actions = []
+
+		for action in task.actions:
+			action_name, (action_vars, vars_class), preconds, effects = action
+			positive_preconds = [precond for precond in preconds if precond[0]]
+			add_effects = tuple([(pred_name, effect_vars) for is_add_effect, pred_name, effect_vars in effects if is_add_effect])
+
+			if len(add_effects) == 0: # The action is useless in the delete relaxation
+				continue
+
+			# schema = (action_name, num_params, fluent_preconds, add_effects)
+			fluent_preconds = tuple([(pred_name, precond_vars) for _, pred_name, precond_vars in positive_preconds if pred_name in fluent_preds])
+			schema = (action_name, vars_class.count('param'), fluent_preconds, add_effects)
+
+			if len(fluent_preconds) == 0:
+				relaxed_action = (action_name, (action_vars, ('param',)*len(action_vars)), tuple(positive_preconds), effects)
+				var_assigns = task._get_applicable_var_assigns_action(relaxed_action, [[-1]*len(action_vars)], self._static_atoms)
+				self._static_ground_actions.extend([(schema, tuple(var_assign)) for var_assign in var_assigns])
+				continue
+
+			for delta_ind, (_, delta_pred, delta_vars) in enumerate(positive_preconds):
+				if delta_pred not in fluent_preds:
+					continue
+
+				delta_allowed_types = tuple([type_hierarchy[action_vars[var]] for var in delta_vars])
+				steps = []
+
+				for step_pred, key_positions, key_vars, bind_vars, dup_positions, allowed_types in \
+					self._get_join_steps(action_vars, positive_preconds, delta_ind):
+					key_getter = itemgetter(*key_vars) if len(key_vars) > 0 else None
+
+					if step_pred is None: # Free variable, instantiated on the objects of its type
+						index = {tuple() : [(obj_ind,) for obj_ind, obj_type in enumerate(object_types) if obj_type == action_vars[bind_vars[0][1]]]}
+						steps.append((key_getter, bind_vars, True, index))
+
+					elif step_pred not in fluent_preds:
+						index_key = (step_pred, key_positions, dup_positions, allowed_types)
+						if index_key not in static_indexes:
+							static_indexes[index_key] = task._index_atoms(static_atoms_by_pred.get(step_pred, []), allowed_types, key_positions, dup_positions)
+						steps.append((key_getter, bind_vars, True, static_indexes[index_key]))
+
+					else:
+						index_key = (step_pred, key_positions, dup_positions, allowed_types)
+						if index_key not in fluent_index_ids:
+							fluent_index_ids[index_key] = len(fluent_index_ids)
+							self._fluent_indexes_by_pred[step_pred].append((fluent_index_ids[index_key], allowed_types,
+																		   itemgetter(*key_positions) if len(key_positions) > 0 else None, dup_positions))
+						steps.append((key_getter, bind_vars, False, fluent_index_ids[index_key]))
+
+				self._rules_by_pred[delta_pred].append((schema, len(action_vars), delta_vars, delta_allowed_types, tuple(steps)))
+
+		self._num_fluent_indexes = len(fluent_index_ids)
+
+	"""
+	Auxiliary function used by __init__. It returns the join steps needed to bind all the variables @action_vars of an action,
+	once the variables of its positive precondition @positive_preconds[@delta_ind] are bound. The remaining positive preconditions
+	are joined in a greedy order (first those sharing the most variables with the already bound ones, preferring static predicates),
+	followed by the variables which do not appear in any positive precondition.
+	Each step is a tuple (pred_name, key_positions, key_vars, bind_vars, dup_positions, allowed_types) in the format used by
+	Parser._index_atoms(), where pred_name is None for free variables.
+	"""
+	def _get_join_steps(self, action_vars, positive_preconds, delta_ind):
+		type_hierarchy = self.task.type_hierarchy
+		is_var_bound = [False]*len(action_vars)
+
+		for var in positive_preconds[delta_ind][2]:
+			is_var_bound[var] = True
+
+		remaining_preconds = [precond for precond_ind, precond in enumerate(positive_preconds) if precond_ind != delta_ind]
+		steps = []
+
+		# Preconditions whose variables are all bound go first, then those sharing some variable with the bound ones
+		def get_precond_priority(precond):
+			num_bound_vars = sum([is_var_bound[var] for var in precond[2]])
+			return (num_bound_vars == len(precond[2]), num_bound_vars > 0, precond[1] not in self._fluent_preds, num_bound_vars)
+
+		while len(remaining_preconds) > 0:
+			precond = max(remaining_preconds, key=get_precond_priority)
+			remaining_preconds.remove(precond)
+			_, precond_pred, precond_vars = precond
+
+			key_positions = tuple([pos for pos, var in enumerate(precond_vars) if is_var_bound[var]])
+			key_vars = tuple([precond_vars[pos] for pos in key_positions])
+			allowed_types = tuple([(pos, type_hierarchy[action_vars[var]]) for pos, var in enumerate(precond_vars) if not is_var_bound[var]])
+
+			bind_vars, dup_positions = get_bind_vars(precond_vars, key_positions)
+
+			for var in precond_vars:
+				is_var_bound[var] = True
+
+			steps.append((precond_pred, key_positions, key_vars, tuple(bind_vars), tuple(dup_positions), allowed_types))
+
+		for var, is_bound in enumerate(is_var_bound):
+			if not is_bound:
+				steps.append((None, tuple(), tuple(), ((0, var),), tuple(), tuple()))
+
+		return steps
+
+	# Returns the heuristic value of @state (a set or frozenset of atoms)
+	def __call__(self, state):
+		return self.evaluate(state)
+
+	# Returns the heuristic value of @state (a set or frozenset of atoms)
+	def evaluate(self, state):
+		state = frozenset(state)
+		value = self._cache.get(state)
+
+		if value is None:
+			costs, supporters = self._get_costs(state)
+			value = self._get_heuristic_value(costs, supporters)
+			self._cache.put(state, value)
+
+		return value
+
+	"""
+	Returns the relaxed plan of @state, as a list of ground actions (action_name, var_assign) sorted by name and variable assignment,
+	obtained from the h_add best supporters of the goals. Returns None if the goal is unreachable in the delete relaxation.
+	"""
+	def get_relaxed_plan(self, state):
+		costs, supporters = self._get_costs(frozenset(state))
+
+		if costs is None:
+			return None
+
+		return sorted(self._get_relaxed_plan(costs, supporters))
+
+	def clear_cache(self):
+		self._cache.clear()
+
+	# Returns a dictionary with the cache statistics (see Parser.cache_info())
+	def cache_info(self):
+		return {'hits': self._cache.hits, 'misses': self._cache.misses, 'size': len(self._cache), 'max_size': self._cache.max_size}
+
+	def _get_heuristic_value(self, costs, supporters):
+		if costs is None:
+			return float('inf')
+		elif self.heuristic == 'max':
+			return max([costs[atom] for atom in self._goal_atoms], default=0)
+		elif self.heuristic == 'add':
+			return sum([costs[atom] for atom in self._goal_atoms])
+		else:
+			return len(self._get_relaxed_plan(costs, supporters))
+
+	"""
+	Auxiliary function which returns the set of ground actions (action_name, var_assign) of the relaxed plan, obtained by
+	following the best supporters of the goals backwards.
+	"""
+	def _get_relaxed_plan(self, costs, supporters):
+		relaxed_plan = set()
+		marked_atoms = set()
+		open_atoms = list(self._goal_atoms)
+
+		while len(open_atoms) > 0:
+			atom = open_atoms.pop()
+
+			if atom in marked_atoms or costs[atom] == 0:
+				continue
+
+			marked_atoms.add(atom)
+			(action_name, num_params, fluent_preconds, _), var_assign = supporters[atom]
+			relaxed_plan.add((action_name, var_assign[:num_params]))
+			open_atoms.extend([(pred_name, tuple([var_assign[var] for var in precond_vars])) for pred_name, precond_vars in fluent_preconds])
+
+		return relaxed_plan
+
+	"""
+	Runs the generalized Dijkstra from @state and returns the tuple (costs, supporters), where costs maps each reached fluent atom
+	to its cost (h_max or h_add cost, depending on self.heuristic) and supporters maps each reached atom which is not in @state to
+	its best supporter, as a tuple (schema, var_assign). The search stops as soon as all the goals are reached.
+	If some goal is unreachable, it returns (None, None).
+	"""
+	def _get_costs(self, state):
+		if not self._is_static_goal_reached:
+			return None, None
+
+		object_types = self.task.object_types
+		fluent_preds = self._fluent_preds
+		rules_by_pred = self._rules_by_pred
+		fluent_indexes_by_pred = self._fluent_indexes_by_pred
+		is_max = self.heuristic == 'max'
+
+		costs = dict() # Final costs
+		best_costs = dict() # Tentative costs
+		supporters = dict()
+		fluent_indexes = [dict() for _ in range(self._num_fluent_indexes)]
+		num_open_goals = len(self._goal_atoms)
+
+		queue = [(0, atom) for atom in state if atom[0] in fluent_preds]
+		best_costs.update([(atom, 0) for _, atom in queue])
+
+		# Adds the atoms of the add effects of the ground action (schema, var_assign), whose cost is action_cost
+		def add_effects(schema, var_assign, action_cost):
+			for pred_name, effect_vars in schema[3]:
+				atom = (pred_name, tuple([var_assign[var] for var in effect_vars]))
+
+				if action_cost < best_costs.get(atom, action_cost+1):
+					best_costs[atom] = action_cost
+					supporters[atom] = (schema, var_assign)
+					heapq.heappush(queue, (action_cost, atom))
+
+		# Returns the cost of the ground action (schema, var_assign), whose preconditions have all been reached
+		def get_action_cost(schema, var_assign):
+			return 1 + sum([costs[atom] for atom in set([(pred_name, tuple([var_assign[var] for var in precond_vars])) \
+															for pred_name, precond_vars in schema[2]])])
+
+		for schema, var_assign in self._static_ground_actions:
+			add_effects(schema, var_assign, 1)
+
+		heapq.heapify(queue)
+
+		while len(queue) > 0 and num_open_goals > 0:
+			atom_cost, atom = heapq.heappop(queue)
+
+			if atom in costs:
+				continue
+
+			costs[atom] = atom_cost
+			atom_pred, atom_obj_inds = atom
+
+			if atom in self._goal_atoms:
+				num_open_goals -= 1
+
+			# Add the atom to the fluent indexes of its predicate
+			for index_id, allowed_types, key_getter, dup_positions in fluent_indexes_by_pred[atom_pred]:
+				types_correct = True
+				for pos, obj_allowed_types in allowed_types:
+					if object_types[atom_obj_inds[pos]] not in obj_allowed_types:
+						types_correct = False
+						break
+
+				if types_correct and (len(dup_positions) == 0 or all(atom_obj_inds[pos] == atom_obj_inds[first_pos] for pos, first_pos in dup_positions)):
+					key = key_getter(atom_obj_inds) if key_getter is not None else tuple()
+					index = fluent_indexes[index_id]
+
+					if key in index:
+						index[key].append(atom_obj_inds)
+					else:
+						index[key] = [atom_obj_inds]
+
+			# Trigger the rules whose preconditions contain the atom's predicate
+			for schema, num_vars, delta_vars, delta_allowed_types, steps in rules_by_pred[atom_pred]:
+				var_assign = [-1]*num_vars
+				is_match = True
+
+				for var, obj_ind, allowed_types in zip(delta_vars, atom_obj_inds, delta_allowed_types):
+					if object_types[obj_ind] not in allowed_types or (var_assign[var] != -1 and var_assign[var] != obj_ind):
+						is_match = False
+						break
+					var_assign[var] = obj_ind
+
+				if not is_match:
+					continue
+
+				for full_var_assign in _extend_var_assign(var_assign, steps, 0, fluent_indexes):
+					action_cost = atom_cost + 1 if is_max else get_action_cost(schema, full_var_assign)
+					add_effects(schema, full_var_assign, action_cost)
+
+		if num_open_goals > 0:
+			return None, None
+
+		return costs, supporters
+
+"""
+Auxiliary function used by RelaxedHeuristic._get_costs. It returns an iterator over the (complete) variable assignments, as tuples,
+obtained by extending @var_assign according to @steps, starting at @step_ind. Each step is a tuple (key_getter, bind_vars, is_static, index),
+where index is either the index itself (for static steps) or the id of the index in @fluent_indexes.
+"""
+def _extend_var_assign(var_assign, steps, step_ind, fluent_indexes):
+	if step_ind == len(steps):
+		yield tuple(var_assign)
+		return
+
+	key_getter, bind_vars, is_static, index = steps[step_ind]
+	if not is_static:
+		index = fluent_indexes[index]
+
+	key = key_getter(var_assign) if key_getter is not None else tuple()
+
+	for row in index.get(key, ()):
+		new_var_assign = var_assign.copy()
+		for pos, var in bind_vars:
+			new_var_assign[var] = row[pos]
+
+		yield from _extend_var_assign(new_var_assign, steps, step_ind+1, fluent_indexes)
@@ -1,7 +1,8 @@
 from operator import itemgetter
 from collections import deque
-from itertools import product, chain
+from itertools import chain, product
 import copy
+import io
 
 from tarski.io import PDDLReader
 from tarski.syntax.formulas import CompoundFormula, QuantifiedFormula, Atom, Tautology
@@ -9,6 +10,523 @@ from tarski.fstrips.fstrips import AddEffect, DelEffect
 
 import sys
 
+from lifted_pddl.codegen import compile_actions as compile_action_schemas
+from lifted_pddl.utils import LRUCache, get_bind_vars
+
+"""
+This class implements the successor generation functionality (i.e., obtaining the applicable actions at a state and the state
+resulting from applying an action), which is shared by Parser and Task.
+Unlike the public methods of Parser, these methods receive the state (as a set of atoms) as a parameter and don't modify (or store
+anything in) self, so they can be called concurrently.
+Subclasses must define self.actions, self.type_hierarchy and self.object_types.
+"""
+class _SuccessorGenerator:
+
+	__slots__ = ()
+
+	# Returns the action schema whose name is @action_name
+	def _get_action_schema(self, action_name):
+		action = [action_schema for action_schema in self.actions if action_schema[0]==action_name]
+		assert len(action)==1, "There are several action schemas with the same name!"
+
+		return action[0]
+
+	"""
+	Auxiliary function used by _get_applicable_var_assigns_action. It checks every negative precondition in @negative_preconds
+	whose variables are all bound (according to @is_var_bound) and removes the variable assignments in @var_assigns which do not
+	satisfy it (i.e., those where the grounded precondition is in @atoms).
+	It returns the filtered variable assignments and a list with the negative preconditions which could not be checked yet
+	(since some of their variables are still free).
+	"""
+	def _filter_var_assigns_negative_preconds(self, var_assigns, negative_preconds, is_var_bound, atoms):
+		remaining_negative_preconds = []
+
+		for precond in negative_preconds:
+			_, precond_pred, precond_vars = precond
+
+			if not all(is_var_bound[var] for var in precond_vars):
+				remaining_negative_preconds.append(precond)
+				continue
+
+			# Substitute the precondition variables by the objects given by each var_assign and check if the grounded precondition
+			# is in the state atoms
+			var_assigns = [var_assign for var_assign in var_assigns if (precond_pred, tuple([var_assign[var] for var in precond_vars])) not in atoms]
+
+			if len(var_assigns) == 0:
+				break
+
+		return var_assigns, remaining_negative_preconds
+
+	"""
+	Auxiliary function used by get_applicable_actions. It receives a set of variable assignments (each one with an arbitrary number of free and bind variables),
+	and returns a list with all the full variable assignments obtained from them and which correspond to applicable ground actions.
+	The full variable assignments are returned as a tuple of tuples.
+
+	<Note>: @_var_assigns must be a list of lists
+	        @atoms must be a set (or frozenset) of tuples and not a set of lists
+	"""
+	def _get_applicable_var_assigns_action(self, action, _var_assigns, atoms):
+		# Obtain information about the domain and problem
+		type_hierarchy = self.type_hierarchy
+		objects = self.object_types
+
+		action_name, action_var_info, action_preconds, _ = action
+		action_vars, vars_class = action_var_info
+
+		# Check nullary preconditions
+		# If they are not met, there are no applicable ground actions (and, hence, no valid var assignments)
+
+		# Process action preconditions corresponding to nullary predicates (those of arity 0)
+		# Check if each nullary predicate in the preconditions appears in the state atoms.
+		# If so, we remove the nullary predicates from the action preconditions and check the rest of the preconditions.
+		# If not, the action is not applicable.
+		nullary_preconds = [precond for precond in action_preconds if len(precond[2]) == 0]
+
+		nullary_preconds_in_atoms = True
+		for nullary_precond in nullary_preconds:
+			if nullary_precond[1:] not in atoms: # The nullary precondition does not appear in the atoms
+				nullary_preconds_in_atoms = False
+				break
+
+		# The current action is not applicable
+		if not nullary_preconds_in_atoms:
+			return tuple() # empty tuple
+
+		# Remove the nullary predicates from the action preconditions
+		action_preconds = [precond for precond in action_preconds if len(precond[2]) > 0]
+
+		# Split the preconditions into positive and negative (i.e., (not ...))
+		positive_preconds = [precond for precond in action_preconds if precond[0]==True]
+		negative_preconds = [precond for precond in action_preconds if precond[0]==False]
+
+		# <Existential preconditions>
+		# The positive preconditions which contain variables introduced by existential preconditions are not joined here. Instead, they are
+		# evaluated afterwards as a semi-join (see _get_var_assigns_semi_join), so that we only look for the first witness of each
+		# variable assignment (instead of enumerating all of them)
+		exists_vars = set([var for var, var_class in enumerate(vars_class) if var_class == 'exists'])
+		exists_positive_preconds = [precond for precond in positive_preconds if not exists_vars.isdisjoint(precond[2])]
+		positive_preconds = [precond for precond in positive_preconds if exists_vars.isdisjoint(precond[2])]
+
+		# Variables which are bound by the semi-join, i.e., action parameters which appear in some existential precondition
+		semi_join_vars = set([var for precond in exists_positive_preconds for var in precond[2]]) | exists_vars
+
+		# List of (possibly partial) variable assignments corresponding to potentially aplicable actions
+		var_assigns = copy.deepcopy(_var_assigns) # Deep copy the parameter so that it is not modified
+		is_var_bound = [var != -1 for var in var_assigns[0]] # Contains True if the corresponding variable is bound, and False if it's free
+
+		# <Negative preconditions>
+		# Each negative precondition is checked as soon as all its variables are bound, instead of after all the positive preconditions
+		# have been processed and the free variables expanded. This way, intermediate variable assignments which violate a negative precondition
+		# are discarded as soon as possible.
+		# The negative preconditions whose variables are already bound (e.g., when called from is_action_applicable) are checked right away.
+		var_assigns, negative_preconds = self._filter_var_assigns_negative_preconds(var_assigns, negative_preconds, is_var_bound, atoms)
+
+		if len(var_assigns) == 0:
+			return tuple()
+
+		# Process the positive preconditions -> obtain the list of variable assignments which satisfy the positive preconditions
+		for precond in positive_preconds:
+			_, precond_pred, precond_vars = precond
+			new_var_assigns = [] # Will contain the partial variable assignments after we process the current precondition (precond)
+
+			# Obtain mapping from the indexes of the atom's objects to the indexes of the variables in var_assigns
+			# Then, select the subset of those indexes which we need to check to see if an atom matches a variable assignment in var_assigns
+			# This subset corresponds to those variables which are already bound and also appear at the precondition (precond_vars)
+			"""
+			Examples:
+			- Precondition: ('in-city', (2, 3))
+			- Indexes of atom objects: (0, 1)
+			- Indexes of variables in var_assigns: (2, 3) -> atom_obj[0] maps to var[2] in var_assigns and atom_obj[1] maps to var[3]
+
+			Let's assume we have var assignments like (6, 8, -1, 5) (vars 0, 1 and 3 are bound, and var 2 is free).
+			Then, we only need to check that atom_obj[1] matches var[3] in the var_assignments. Therefore:
+			- Indexes of atom objects to check: (1,)
+			- Indexes of variables in var_assigns to check: (3,)
+			"""
+			inds_to_check = [(ind, var) for ind, var in enumerate(precond_vars) if is_var_bound[var]]
+
+			# If len(inds_to_check) == 0, this means that we don't have to check any variable in the assignments for this precondition
+			# i.e., as long as an atom is of the correct predicate and its objects of the correct type, all partial variable assignments match the atom
+			if len(inds_to_check) == 0:
+				no_vars_to_check = True
+				atom_obj_inds_to_check, vars_to_check = tuple(), tuple()
+			else:
+				no_vars_to_check = False	
+				atom_obj_inds_to_check, vars_to_check = zip(*inds_to_check)
+
+			# Free variables which appear several times in the precondition (e.g., (q ?x ?x)) must be instantiated on the same object
+			# in all those positions, so atoms with different objects in them (e.g., (q o1 o2)) are discarded
+			_, dup_positions = get_bind_vars(precond_vars, atom_obj_inds_to_check)
+
+			# Set of types each object of the atom can belong to, according to the type of the corresponding variable
+			# We only need to check the types of the free variables, since the objects of the bound variables are already of the correct
+			# type (atoms with objects of the wrong type in those positions will not match any variable assignment)
+			precond_allowed_types = [(ind, type_hierarchy[action_vars[var]]) for ind, var in enumerate(precond_vars) if not is_var_bound[var]]
+
+			for atom in atoms:
+				atom_pred, atom_obj_inds = atom
+
+				# Check if the atom's predicate is the same as that of the precondition
+				if atom_pred == precond_pred:
+					# The types of the objects the atom is instantiated on must inherit from the type of the corresponding parameter type
+					# Atoms of the wrong type are discarded before trying to match them against the variable assignments
+					types_correct = True
+					for ind, allowed_types in precond_allowed_types:
+						if objects[atom_obj_inds[ind]] not in allowed_types:
+							types_correct = False
+							break
+
+					if types_correct and (len(dup_positions) == 0 or all(atom_obj_inds[pos] == atom_obj_inds[first_pos] for pos, first_pos in dup_positions)):
+
+						for var_assign in var_assigns:
+							# Check if the atom matches the current var assignment (var_assign)
+							# It is a match if the atom's objects match the objects of the corresponding vars in var_assign for those
+							# vars which are bound, i.e., atom_obj_inds[atom_obj_inds_to_check] == var_assign[vars_to_check]
+							if no_vars_to_check or itemgetter(*atom_obj_inds_to_check)(atom_obj_inds) == itemgetter(*vars_to_check)(var_assign):
+								new_var_assign = var_assign.copy()
+								deque(map(new_var_assign.__setitem__, precond_vars, atom_obj_inds), maxlen=0) # The deque is simply to evaluate the map, as in python 3 it has lazy evaluation
+
+								new_var_assigns.append(new_var_assign)
+
+
+			# Update the partial variable assignments
+			var_assigns = new_var_assigns
+
+			# If this happens, then the current precondition is not met for any variable substitution, so the action is not applicable!
+			if len(var_assigns) == 0:
+				return tuple() # empty tuple (no need to check the remaining preconditions)
+
+			# Bind variables which appear in the precondition
+			for var in precond_vars:
+				is_var_bound[var] = True
+
+			# Check the negative preconditions whose variables have just been bound
+			var_assigns, negative_preconds = self._filter_var_assigns_negative_preconds(var_assigns, negative_preconds, is_var_bound, atoms)
+
+			if len(var_assigns) == 0:
+				return tuple()
+
+
+		# Check if there are still free variables in var_assigns (all the var assignments have the same variables bound)
+		# If there are, they can be instantiated on any object of the correct type (they correspond to variables which don't appear
+		# in any positive precondition).
+		# Instead of expanding all of them at once with a cartesian product, we expand them one at a time and check the negative
+		# preconditions as soon as their variables are bound. Free variables which appear in negative preconditions are expanded
+		# first, so that the variable assignments which are discarded never get multiplied by the rest of free variables.
+		negative_precond_vars = set(var for precond in negative_preconds for var in precond[2])
+		free_vars = [var for var, is_bound in enumerate(is_var_bound) if not is_bound and var not in semi_join_vars]
+		free_vars.sort(key=lambda var: var not in negative_precond_vars) # Stable sort: variables in negative preconditions go first
+
+		for free_var in free_vars:
+			# Objects of the corresponding variable type
+			var_type = action_vars[free_var]
+			var_objs = [ind_obj for ind_obj, obj_type in enumerate(objects) if obj_type==var_type]
+
+			new_var_assigns = []
+			for var_assign in var_assigns:
+				for obj in var_objs:
+					new_var_assign = var_assign.copy()
+					new_var_assign[free_var] = obj
+					new_var_assigns.append(new_var_assign)
+
+			var_assigns = new_var_assigns
+			is_var_bound[free_var] = True
+
+			var_assigns, negative_preconds = self._filter_var_assigns_negative_preconds(var_assigns, negative_preconds, is_var_bound, atoms)
+
+			# If there are no var_assigns left, we know that no variable substitution
+			# satisfies all the preconditions
+			if len(var_assigns) == 0:
+				return tuple()
+
+		# If the action has no existential preconditions, var_assigns already contains the full variable assignments
+		# Convert from list of lists to tuple of tuples
+		if len(exists_vars) == 0:
+			return tuple([tuple(var_assign) for var_assign in var_assigns])
+
+		# Otherwise, we still need to bind the variables which appear in existential preconditions
+		return self._get_var_assigns_semi_join(action, var_assigns, is_var_bound, exists_positive_preconds, negative_preconds, atoms)
+
+	"""
+	Auxiliary function used by _get_var_assigns_semi_join. It receives a list @atoms_obj_inds with the objects of the atoms of some predicate
+	and returns a dictionary which indexes them by the objects at positions @key_positions. Atoms whose objects are not of the types
+	given by @allowed_types (a list of tuples (pos, types)), or which contain different objects at the positions given by @dup_positions (pairs of positions
+	corresponding to the same variable), are discarded.
+	"""
+	def _index_atoms(self, atoms_obj_inds, allowed_types, key_positions, dup_positions):
+		objects = self.object_types
+		key_getter = itemgetter(*key_positions) if len(key_positions) > 0 else None
+		index = dict()
+
+		for atom_obj_inds in atoms_obj_inds:
+			# Discard the atoms whose objects are of the wrong type
+			types_correct = True
+			for pos, obj_allowed_types in allowed_types:
+				if objects[atom_obj_inds[pos]] not in obj_allowed_types:
+					types_correct = False
+					break
+
+			if types_correct and (len(dup_positions) == 0 or all(atom_obj_inds[pos] == atom_obj_inds[first_pos] for pos, first_pos in dup_positions)):
+				key = key_getter(atom_obj_inds) if key_getter is not None else tuple()
+
+				if key in index:
+					index[key].append(atom_obj_inds)
+				else:
+					index[key] = [atom_obj_inds]
+
+		return index
+
+	"""
+	Auxiliary function used by _get_applicable_var_assigns_action. It receives a list of variable assignments @var_assigns, where
+	all the variables not appearing in @positive_preconds are bound, and returns a tuple with the (distinct) assignments of the action
+	parameters which can be extended to satisfy @positive_preconds and @negative_preconds, i.e., for which there exists a witness
+	for the variables introduced by existential preconditions.
+	The variables introduced by existential preconditions are removed from the returned assignments.
+
+	Instead of joining all the preconditions (which would enumerate every witness of every assignment and then require removing
+	the repeated assignments), each variable assignment is extended depth-first. Once all the action parameters are bound, we
+	stop at the first witness for the remaining (existential) variables and never visit the same parameter assignment twice.
+	"""
+	def _get_var_assigns_semi_join(self, action, var_assigns, is_var_bound, positive_preconds, negative_preconds, atoms):
+		type_hierarchy = self.type_hierarchy
+		objects = self.object_types
+
+		_, action_var_info, _, _ = action
+		action_vars, vars_class = action_var_info
+		num_params = vars_class.count('param') # Note: we know that vars corresponding to existential preconditions go after vars corresponding to action params
+
+		# Atoms of each predicate appearing in the preconditions
+		precond_preds = set([precond[1] for precond in positive_preconds])
+		atoms_by_pred = {pred : [] for pred in precond_preds}
+		for atom_pred, atom_obj_inds in atoms:
+			if atom_pred in atoms_by_pred:
+				atoms_by_pred[atom_pred].append(atom_obj_inds)
+
+		# Obtain the steps used to extend the variable assignments, in order. Each step is either a positive precondition
+		# (whose atoms bind its free variables) or a free variable which does not appear in any positive precondition (which
+		# can be instantiated on any object of its type).
+		# <Note>: all the variable assignments have the same variables bound, so the steps are the same for all of them
+		# Each step is represented as a list [key_getter, bind_vars, index, negative_preconds, index_info]:
+		#	- key_getter obtains, from a variable assignment, the objects of the variables which are already bound before the step
+		#	  (or None if there are no such variables)
+		#	- bind_vars contains tuples (pos, var), meaning that the step binds variable var to the object at position pos of the matching row
+		#	- index is a dictionary which maps the objects returned by key_getter to the rows (tuples of objects) which match them.
+		#	  For a precondition step, the rows are the objects of the (type-correct) atoms of the precondition predicate. For a free variable
+		#	  step, each row contains a single object of the variable type.
+		#	  Precondition indexes are only built (from index_info) the first time the step is reached.
+		#	- negative_preconds contains the negative preconditions which can be checked after the step, i.e., those whose variables
+		#	  become bound at that step
+		steps = []
+		params_bound_step = None # Index of the first step which is executed with all the action parameters bound
+		is_var_bound = is_var_bound.copy()
+
+		for precond in positive_preconds:
+			_, precond_pred, precond_vars = precond
+			precond_allowed_types = [(pos, type_hierarchy[action_vars[var]]) for pos, var in enumerate(precond_vars) if not is_var_bound[var]]
+
+			key_positions = [pos for pos, var in enumerate(precond_vars) if is_var_bound[var]]
+			key_vars = tuple([precond_vars[pos] for pos in key_positions])
+
+			# If a free variable appears several times in the precondition, the atom must contain the same object in all those positions
+			bind_vars, dup_positions = get_bind_vars(precond_vars, key_positions)
+
+			key_getter = itemgetter(*key_vars) if len(key_vars) > 0 else None
+			index_info = (atoms_by_pred[precond_pred], precond_allowed_types, key_positions, dup_positions)
+			steps.append([key_getter, bind_vars, None, None, index_info])
+
+			for var in precond_vars:
+				is_var_bound[var] = True
+
+		for var, is_bound in enumerate(is_var_bound):
+			if not is_bound:
+				var_objs = [(ind_obj,) for ind_obj, obj_type in enumerate(objects) if obj_type==action_vars[var]]
+				steps.append([None, [(0, var)], {tuple(): var_objs}, None, None])
+
+		# Obtain the negative preconditions checked at each step and the step from which all action parameters are bound
+		is_var_bound = [var not in [bind_var for step in steps for _, bind_var in step[1]] for var in range(len(is_var_bound))]
+
+		for step_ind, step in enumerate(steps):
+			if params_bound_step is None and all(is_var_bound[:num_params]):
+				params_bound_step = step_ind
+
+			for _, var in step[1]:
+				is_var_bound[var] = True
+
+			step[3] = [precond for precond in negative_preconds if all(is_var_bound[var] for var in precond[2])]
+			negative_preconds = [precond for precond in negative_preconds if not all(is_var_bound[var] for var in precond[2])]
+
+		if params_bound_step is None:
+			params_bound_step = len(steps)
+
+		# Returns the variable assignments obtained by extending @var_assign according to the step given by @step_ind
+		def extend_var_assign(var_assign, step_ind):
+			step = steps[step_ind]
+			key_getter, bind_vars, index, step_negative_preconds, index_info = step
+
+			if index is None:
+				index = step[2] = self._index_atoms(*index_info)
+
+			for row in index.get(key_getter(var_assign) if key_getter is not None else tuple(), ()):
+				new_var_assign = var_assign.copy()
+				for pos, var in bind_vars:
+					new_var_assign[var] = row[pos]
+
+				# Check the negative preconditions whose variables have just been bound
+				if all((precond_pred, tuple([new_var_assign[var] for var in precond_vars])) not in atoms for _, precond_pred, precond_vars in step_negative_preconds):
+					yield new_var_assign
+
+		# Returns True if @var_assign can be extended to satisfy the steps starting at @step_ind (first-witness early exit)
+		def has_witness(var_assign, step_ind):
+			if step_ind == len(steps):
+				return True
+
+			return any(has_witness(new_var_assign, step_ind+1) for new_var_assign in extend_var_assign(var_assign, step_ind))
+
+		full_var_assigns = []
+		found_param_assigns = set()
+
+		# Enumerate the assignments of the action parameters which can be obtained by extending @var_assign according to the steps
+		# starting at @step_ind. For each one, we only look for a single witness.
+		def search_param_assigns(var_assign, step_ind):
+			if step_ind == params_bound_step:
+				param_assign = tuple(var_assign[:num_params])
+
+				if param_assign not in found_param_assigns and has_witness(var_assign, step_ind):
+					found_param_assigns.add(param_assign)
+					full_var_assigns.append(param_assign)
+			else:
+				for new_var_assign in extend_var_assign(var_assign, step_ind):
+					search_param_assigns(new_var_assign, step_ind+1)
+
+		for var_assign in var_assigns:
+			search_param_assigns(var_assign, 0)
+
+		return tuple(full_var_assigns)
+
+
+	# Returns the actions applicable at the state given by @atoms, in the same format as Parser.get_applicable_actions()
+	def _get_applicable_actions(self, atoms):
+		applicable_actions = dict()
+
+		action_schemas = self.actions
+
+		for action in action_schemas:
+			action_name, action_var_info, action_preconds, _ = action
+			action_vars, vars_class = action_var_info
+
+			full_var_assigns = self._get_applicable_var_assigns_action(action, [[-1]*len(action_vars)], atoms)
+
+			# Save the variable assignments (groundings) which make the current action applicable
+			applicable_actions[action_name] = full_var_assigns
+
+		return applicable_actions
+
+	# Returns True if the ground action given by @action_name and @var_assign is applicable at the state given by @atoms
+	def _is_action_applicable(self, atoms, action_name, var_assign):
+		type_hierarchy = self.type_hierarchy
+		objects = self.object_types
+
+		# Select the action_schema corresponding to @action_name
+		action = self._get_action_schema(action_name)
+
+		action_name, action_var_info, action_preconds, action_effects = action
+		action_vars, vars_class = action_var_info
+
+		# Obtain the action parameters, i.e., those variables of class 'param'
+		action_params = [var for var, var_class in zip(action_vars, vars_class) if var_class == 'param']
+
+		assert len(var_assign) == len(action_params), "The number of variables in var_assign must be the same that the name of action parameters."
+
+		# Check if the objects the action parameters are instantiated on are of the correct type
+		for obj_ind, param_type in zip(var_assign, action_params):
+			if objects[obj_ind] not in type_hierarchy[param_type]:
+				return False # If a single parameter is of the incorrect type, we know the action is not applicable
+
+		# Add free variables to @var_assign, accounting for the variables in existential preconditions
+		num_exist_vars = vars_class.count('exists')
+		var_assigns = [list(var_assign) + [-1]*num_exist_vars] # Note: we know that vars corresponding to existential preconditions go after vars corresponding to action params
+
+		# Obtain all the variable instantiations where the bind variables correspond to the variables in @var_assign
+		# and the free variables correspond to the variables given by existential preconditions
+		full_var_assigns = self._get_applicable_var_assigns_action(action, var_assigns, atoms)
+
+		# If the action is applicable, there will be at least one valid variable assignment in full_var_assigns
+		return len(full_var_assigns) > 0
+
+	"""
+	Forward reachability analysis in the delete relaxation of the task (i.e., ignoring delete effects and negative preconditions).
+	Starting from the state given by @atoms, it applies the add effects of all the applicable ground actions until no new atom is reached.
+	It returns a tuple (reachable_atoms, reachable_actions), where reachable_atoms is the set of atoms reached and reachable_actions
+	is a dictionary (in the same format as Parser.get_applicable_actions()) with the ground actions applicable at reachable_atoms.
+	Every ground action which is applicable at some state reachable from @atoms is contained in reachable_actions.
+	"""
+	def _get_relaxed_reachability(self, atoms):
+		# Relaxed action schemas: negative preconditions are removed
+		relaxed_actions = [(action_name, action_var_info, tuple([precond for precond in preconds if precond[0]]), effects) \
+						   for action_name, action_var_info, preconds, effects in self.actions]
+
+		reachable_atoms = set(atoms)
+		num_atoms = -1
+
+		while len(reachable_atoms) != num_atoms:
+			num_atoms = len(reachable_atoms)
+			reachable_actions = dict()
+
+			for action in relaxed_actions:
+				action_name, (action_vars, vars_class), _, effects = action
+				var_assigns = self._get_applicable_var_assigns_action(action, [[-1]*len(action_vars)], reachable_atoms)
+				reachable_actions[action_name] = var_assigns
+
+				# Apply the add effects
+				add_effects = [(pred_name, effect_vars) for is_add_effect, pred_name, effect_vars in effects if is_add_effect]
+
+				for var_assign in var_assigns:
+					reachable_atoms.update([(pred_name, tuple([var_assign[var] for var in effect_vars])) for pred_name, effect_vars in add_effects])
+
+		return reachable_atoms, reachable_actions
+
+	# Returns the set of atoms resulting from applying the ground action given by @action_name and @var_assign at the state given by @atoms
+	# (see Parser.get_next_state()). @atoms is not modified.
+	def _get_next_state(self, atoms, action_name, var_assign, check_action_applicability=True):
+		# Select the action_schema corresponding to @action_name
+		action = self._get_action_schema(action_name)
+
+		# Copy the atoms, so that the new_atoms don't share the reference
+		new_atoms = set(atoms)
+
+		if check_action_applicability:
+			is_applicable = self._is_action_applicable(atoms, action_name, var_assign)
+
+			# If the action is not applicable, the set of atoms will not change (the state remains the same)
+			if not is_applicable:
+				return new_atoms
+
+		# Perform the variable substitutions for the action_effects (i.e., ground the variables) according to @var_assign
+		_, action_var_info, action_preconds, action_effects = action
+		action_vars, vars_class = action_var_info
+
+		ground_action_effects = []
+		for effect in action_effects:
+			ground_vars = tuple([var_assign[var] for var in effect[2]])
+			ground_effect = tuple([effect[0], effect[1], ground_vars])
+			ground_action_effects.append(ground_effect)
+
+		# Apply the ground effects:
+		# Add effects (effect[0]==True) -> add the corresponding atom
+		# Del effects (effect[0]==False) -> delete the corresponding atom
+		# Note: we assume that no effects are in both the add and delete list
+		for effect in ground_action_effects:
+			effect_atom = (effect[1], effect[2])
+
+			if effect[0]: # Add effect		
+				if effect_atom not in new_atoms: # If the corresponding atom does already exist in the state atoms, we do nothing
+					new_atoms.add(effect_atom)
+			else: # Delete effect
+				if effect_atom in new_atoms: # If the corresponding atom does not exist in the state atoms, we do nothing
+					new_atoms.remove(effect_atom)
+
+		return new_atoms
+
 """
 This class implements functionality for:
 	- Parsing PDDL domains and problems
@@ -20,7 +538,7 @@ This class implements functionality for:
 				- existential preconditions
 				- negative preconditions (although only negative atoms and not negative compound formulas)
 """
-class Parser:
+class Parser(_SuccessorGenerator):
 
 	def __init__(self):
 		self._reader = PDDLReader(raise_on_error=True)
@@ -39,6 +557,19 @@ class Parser:
 		self.object_types = list()
 		self.atoms = set()
 		self.goals = set()
+		self.object_symmetry_groups = tuple()
+		self._goal_symmetry_groups = tuple()
+
+		# Successor cache (disabled by default, see enable_cache())
+		self._applicable_actions_cache = None
+		self._next_state_cache = None
+
+		# Precomputed string fragments used to encode atoms, actions and problems in PDDL (see _get_pddl_fragments())
+		self._pddl_fragments = None
+
+		# Specialized code generated for the action schemas (see parse_domain()) and objects of each type, used by the generated code
+		self._compiled_actions = None
+		self._objects_by_type = dict()
 	
 	def __str__(self):
 		output = ''
@@ -59,14 +590,26 @@ class Parser:
 		output += '\n> Object types (including constants): {}'.format(self.object_types)
 		output += '\n> Atoms in initial state: {}'.format(self.atoms)
 		output += '\n> Goals: {}'.format(self.goals)
+		output += '\n> Object symmetry groups: {}'.format(self.object_symmetry_groups)
 
 		return output
 
-	# We use tarski to parse the PDDL domain
-	def parse_domain(self, domain_path):
+	"""
+	We use tarski to parse the PDDL domain
+
+	@compile_actions If True, specialized Python code is generated (and compiled) for the precondition matching and effects of each action
+					 schema, which is then used instead of the generic successor generator (see codegen.compile_actions()).
+	@cache_dir Directory where the generated code is stored, so that it is reused by later runs with the same domain. If None, the generated
+			   code is only cached in memory.
+	"""
+	def parse_domain(self, domain_path, compile_actions=False, cache_dir=None):
 		# <Parse the domain and obtain the domain information in the tarski encoding>
 		self._reader.parse_domain(domain_path)
 		problem = self._reader.problem
+
+		# The cached successors and PDDL fragments are no longer valid for the new domain
+		self.clear_cache()
+		self._pddl_fragments = None
 		language = problem.language
 
 		# <Represent the domain information in a different encoding>
@@ -222,12 +765,21 @@ class Parser:
 
 			self.actions.add( (action[0], (action_variables, variables_class), preconds_tuple, effects) )
 
+		if compile_actions:
+			self._compiled_actions = compile_action_schemas(self.actions, self.type_hierarchy, cache_dir)
+		else:
+			self._compiled_actions = None
+
 	# We use tarski to parse the PDDL problem
 	# <Note>: This method can only be called after parse_domain()
 	def parse_problem(self, problem_path):
 		problem = self._reader.parse_instance(problem_path)
 		language = problem.language
 
+		# The cached successors and PDDL fragments are no longer valid for the new problem (object indexes may have changed)
+		self.clear_cache()
+		self._pddl_fragments = None
+
 		# Objects
 		# Store two lists, containing the name and type of each object
 		# <Note>: these list also contain the domain constants. For example, if the domain contains 5 constants and the problem 10 objects,
@@ -235,6 +787,7 @@ class Parser:
 		objects = language.constants()
 		self.object_names = [obj.name for obj in objects]
 		self.object_types = [obj.sort.name for obj in objects]
+		self._objects_by_type = self._get_objects_by_type()
 
 		# Atoms, as a set containing each atom
 		# Each atom is represented as a tuple (pred_name, object_indexes), where object_indexes is a tuple containing the index of each object
@@ -258,6 +811,154 @@ class Parser:
 			self.goals = set([(True, x.predicate.name, tuple(self.object_names.index(obj.name) for obj in x.subterms)) if isinstance(x, Atom) else \
 						  (False, x.subformulas[0].predicate.name, tuple(self.object_names.index(obj.name) for obj in x.subformulas[0].subterms)) for x in subformulas])
 
+		# Object symmetries
+		# Groups of interchangeable objects, i.e., objects which can be permuted without changing the initial state, the goals and the object types
+		# Example: ((3, 4, 5), (10, 11)) -> objects 3, 4 and 5 are interchangeable, and so are objects 10 and 11
+		self.object_symmetry_groups = self.get_object_symmetry_groups(self.atoms)
+		# Groups of objects which can be permuted without changing the goals and object types (used to canonicalize states)
+		self._goal_symmetry_groups = self.get_object_symmetry_groups(set())
+
+	"""
+	Returns an immutable Task with the information of the domain and problem stored in the parser, whose initial state (Task.init)
+	is the current state (self.atoms). The Task can be shared by several threads, since its methods receive the state as a parameter
+	instead of reading self.atoms.
+	<Note>: modifying the parser afterwards does not affect the returned Task.
+	"""
+	def compile_task(self):
+		from lifted_pddl.task import Task # Imported here to avoid a circular import
+
+		return Task(self.domain_name, self.types, self.type_hierarchy, self.predicates, self.constant_names, self.constant_types,
+					self.actions, self.object_names, self.object_types, self.atoms, self.goals)
+
+	"""
+	Removes from the parser the action schemas, objects and atoms which can't contribute to achieving the goals (self.goals) from the
+	current state (self.atoms). This method is meant to be called once per problem, before starting the search.
+	It combines two analyses:
+		- Forward reachability (in the delete relaxation): only the ground actions applicable at some reachable state are considered.
+		- Backward relevance (grounded): starting from the goals, a ground action is relevant if it makes true some relevant literal, i.e.,
+		  if it adds a relevant atom or deletes an atom whose negation is relevant, and the preconditions of a relevant ground action
+		  are relevant literals as well. Relevance is computed per ground atom (predicate and objects) instead of per predicate (as a
+		  lifted analysis would), so a package which does not appear in the goals of a logistics problem is removed along with the ground
+		  actions and atoms it appears in. The witnesses of the existential variables of a relevant ground action are restricted to those
+		  which satisfy its positive preconditions at the reachable atoms, so their number is bounded by the matching atoms.
+		  Action schemas without any relevant ground action, objects which appear in no relevant ground action, goal or kept atom
+		  (except for the domain constants) and atoms which are not relevant are removed.
+	<Note>: since objects are removed, the object indexes (in self.object_names, self.atoms, self.goals, etc.) change.
+	<Note>: the analysis can't remove an object when a relevant atom can be achieved by actions on that object. For example, in gripper
+			(free ?g) is a precondition of pick, and it is achieved by dropping any ball, so every ball is relevant.
+
+	It returns a dictionary with the elements removed: {'actions': removed action names, 'objects': removed object names,
+	'atoms': removed atoms in PDDL tuple format (e.g., ('at', 't1', 'l2'))}.
+	"""
+	def prune_irrelevant(self):
+		# <Forward reachability>
+		reachable_atoms, reachable_actions = self._get_relaxed_reachability(self.atoms)
+
+		# Index the reachable ground actions by the literals (is_true, atom) their effects make true
+		achievers = dict()
+
+		for action in self.actions:
+			action_name, _, _, effects = action
+
+			for var_assign in reachable_actions[action_name]:
+				for is_add_effect, pred_name, effect_vars in effects:
+					achievers.setdefault((is_add_effect, (pred_name, tuple([var_assign[var] for var in effect_vars]))), []).append((action, var_assign))
+
+		# <Existential witnesses>
+		# The variable assignments of the ground actions only contain the action parameters. Every witness used at a reachable state
+		# satisfies the positive preconditions at the reachable atoms, so the witnesses are obtained by joining the positive preconditions
+		# of the action with its existential variables treated as parameters. Existential variables which only appear in negative
+		# preconditions (e.g., (exists (?x) (not (p ?x))) ) are not constrained by them, so they are instantiated on every object of their type.
+		# witness_actions maps each action with existential variables to the tuple (witness_action, negative_only_vars, negative_only_witnesses)
+		witness_actions = dict()
+
+		for action_name, (action_vars, vars_class), preconds, effects in self.actions:
+			if 'exists' in vars_class:
+				positive_preconds = tuple([precond for precond in preconds if precond[0]])
+				positive_precond_vars = set([var for precond in positive_preconds for var in precond[2]])
+				negative_only_vars = [var for var, var_class in enumerate(vars_class) if var_class == 'exists' and var not in positive_precond_vars]
+				negative_only_witnesses = [[obj_ind for child_type in self.type_hierarchy[action_vars[var]] for obj_ind in self._objects_by_type.get(child_type, [])] \
+										   for var in negative_only_vars]
+
+				witness_action = (action_name, (action_vars, ('param',)*len(action_vars)), positive_preconds, effects)
+				witness_actions[action_name] = (witness_action, negative_only_vars, negative_only_witnesses)
+
+		# <Backward relevance>
+		relevant_literals = set([(is_true, (pred_name, obj_inds)) for is_true, pred_name, obj_inds in self.goals])
+		relevant_ground_actions = set()
+		open_literals = list(relevant_literals)
+
+		while len(open_literals) > 0:
+			for action, var_assign in achievers.get(open_literals.pop(), tuple()):
+				if (action[0], var_assign) not in relevant_ground_actions:
+					relevant_ground_actions.add((action[0], var_assign))
+
+					if action[0] in witness_actions:
+						witness_action, negative_only_vars, negative_only_witnesses = witness_actions[action[0]]
+						partial_var_assigns = []
+
+						for witnesses in product(*negative_only_witnesses):
+							partial_var_assign = list(var_assign) + [-1]*(len(action[1][0]) - len(var_assign))
+							for var, obj_ind in zip(negative_only_vars, witnesses):
+								partial_var_assign[var] = obj_ind
+							partial_var_assigns.append(partial_var_assign)
+
+						full_var_assigns = self._get_applicable_var_assigns_action(witness_action, partial_var_assigns, reachable_atoms)
+					else:
+						full_var_assigns = (var_assign,)
+
+					for full_var_assign in full_var_assigns:
+						for is_true, pred_name, precond_vars in action[2]:
+							precond_literal = (is_true, (pred_name, tuple([full_var_assign[var] for var in precond_vars])))
+
+							if precond_literal not in relevant_literals:
+								relevant_literals.add(precond_literal)
+								open_literals.append(precond_literal)
+
+		relevant_action_names = set([action_name for action_name, _ in relevant_ground_actions])
+		kept_actions = set([action for action in self.actions if action[0] in relevant_action_names])
+		# An atom is kept if it is relevant, either as a positive or negative literal (removing it would make its negation true)
+		kept_atoms = set([atom for atom in self.atoms if (True, atom) in relevant_literals or (False, atom) in relevant_literals])
+
+		# Objects which must be kept: those in the remaining atoms, goals or relevant ground actions, and the domain constants
+		kept_objects = set([obj_ind for atom in kept_atoms for obj_ind in atom[1]])
+		kept_objects.update([obj_ind for goal in self.goals for obj_ind in goal[2]])
+		kept_objects.update([obj_ind for _, var_assign in relevant_ground_actions for obj_ind in var_assign])
+		kept_objects.update([obj_ind for obj_ind, name in enumerate(self.object_names) if name in self.constant_names])
+
+		# A witness of an existential variable which only appears in negative preconditions does not need to appear in any kept atom,
+		# so all the objects of its type are kept
+		for action in kept_actions:
+			if action[0] in witness_actions:
+				kept_objects.update([obj_ind for var_witnesses in witness_actions[action[0]][2] for obj_ind in var_witnesses])
+
+		removed_objects = set(range(len(self.object_names))) - kept_objects
+		kept_objects = sorted(kept_objects)
+
+		# Report of the removed elements (computed before the object indexes change)
+		pruning_report = {'actions': sorted([action[0] for action in self.actions if action not in kept_actions]),
+						  'objects': [name for obj_ind, name in enumerate(self.object_names) if obj_ind in removed_objects],
+						  'atoms': self.encode_atoms_as_pddl(self.atoms - kept_atoms, 'tuple')}
+
+		# <Remove the pruned elements>
+		# Map the old object indexes to the new ones
+		new_obj_inds = {old_obj_ind : new_obj_ind for new_obj_ind, old_obj_ind in enumerate(kept_objects)}
+
+		self.actions = kept_actions
+		self.object_names = [self.object_names[obj_ind] for obj_ind in kept_objects]
+		self.object_types = [self.object_types[obj_ind] for obj_ind in kept_objects]
+		self._objects_by_type = self._get_objects_by_type()
+		self.atoms = set([(pred_name, tuple([new_obj_inds[obj_ind] for obj_ind in obj_inds])) for pred_name, obj_inds in kept_atoms])
+		self.goals = set([(is_true, pred_name, tuple([new_obj_inds[obj_ind] for obj_ind in obj_inds])) for is_true, pred_name, obj_inds in self.goals])
+
+		# The cached successors, PDDL fragments and symmetries are no longer valid
+		self.clear_cache()
+		self._pddl_fragments = None
+		self.object_symmetry_groups = self.get_object_symmetry_groups(self.atoms)
+		self._goal_symmetry_groups = self.get_object_symmetry_groups(set())
+
+		return pruning_report
+
 	# Returns the name of the object whose index is @obj_ind
 	def get_object_name(self, obj_ind):
 		assert type(obj_ind) == int, "@obj_ind must be an integer"
@@ -307,230 +1008,361 @@ class Parser:
 		self.atoms = curr_state_atoms.copy() # We copy so that the reference is not shared
 
 	"""
-	Auxiliary function used by get_applicable_actions. It receives a set of variable assignments (each one with an arbitrary number of free and bind variables),
-	and returns a list with all the full variable assignments obtained from them and which correspond to applicable ground actions.
-	The full variable assignments are returned as a tuple of tuples.
+	Enables the successor cache, which memoizes the results of get_applicable_actions() and get_next_state().
+	This is useful when the same states are expanded many times (e.g., restarts, iterative deepening or MCTS).
+	Entries are keyed by a canonical representation of the current state (a frozenset with its atoms), so
+	they remain valid after calling set_current_state() with a previously visited state.
+	Each cache stores at most @max_size entries and evicts the least recently used one when full.
+
+	<Note>: the cache assumes that the domain and problem (other than self.atoms) are not modified. It is
+	        automatically cleared when calling parse_domain() or parse_problem().
+	"""
+	def enable_cache(self, max_size=10000):
+		self._applicable_actions_cache = LRUCache(max_size)
+		self._next_state_cache = LRUCache(max_size)
+
+	# Disables the successor cache and discards all its entries
+	def disable_cache(self):
+		self._applicable_actions_cache = None
+		self._next_state_cache = None
+
+	# Removes all the entries (and resets the hit/miss counters) of the successor cache, if it is enabled
+	def clear_cache(self):
+		if self._applicable_actions_cache is not None:
+			self._applicable_actions_cache.clear()
+			self._next_state_cache.clear()
 
-	<Note>: @_var_assigns must be a list of lists
 	"""
-	def _get_applicable_var_assigns_action(self, action, _var_assigns):
-		# Obtain information about the domain and problem
-		type_hierarchy = self.type_hierarchy
-		objects = self.object_types
-		atoms = self.atoms # Note: atoms must be a set of tuples and not a set of lists
+	Returns a dictionary with the statistics of the successor cache, or None if the cache is disabled.
+	The dictionary has the form {'applicable_actions': {'hits': ..., 'misses': ..., 'size': ..., 'max_size': ...}, 'next_state': {...}}
+	"""
+	def cache_info(self):
+		if self._applicable_actions_cache is None:
+			return None
 
-		action_name, action_var_info, action_preconds, _ = action
-		action_vars, vars_class = action_var_info
+		return {name : {'hits': cache.hits, 'misses': cache.misses, 'size': len(cache), 'max_size': cache.max_size} \
+				for name, cache in (('applicable_actions', self._applicable_actions_cache), ('next_state', self._next_state_cache))}
 
-		# Check nullary preconditions
-		# If they are not met, there are no applicable ground actions (and, hence, no valid var assignments)
+	# Returns a dictionary which maps each type to the list of objects of exactly that type (used by the generated code)
+	def _get_objects_by_type(self):
+		objects_by_type = dict()
+		for obj_ind, obj_type in enumerate(self.object_types):
+			objects_by_type.setdefault(obj_type, []).append(obj_ind)
 
-		# Process action preconditions corresponding to nullary predicates (those of arity 0)
-		# Check if each nullary predicate in the preconditions appears in the state atoms.
-		# If so, we remove the nullary predicates from the action preconditions and check the rest of the preconditions.
-		# If not, the action is not applicable.
-		nullary_preconds = [precond for precond in action_preconds if len(precond[2]) == 0]
+		return objects_by_type
 
-		nullary_preconds_in_atoms = True
-		for nullary_precond in nullary_preconds:
-			if nullary_precond[1:] not in atoms: # The nullary precondition does not appear in the atoms
-				nullary_preconds_in_atoms = False
-				break
+	# Same as _SuccessorGenerator._get_applicable_actions, but using the generated code if the action schemas were compiled
+	def _get_applicable_actions(self, atoms):
+		compiled_actions = self._compiled_actions
 
-		# The current action is not applicable
-		if not nullary_preconds_in_atoms:
-			return tuple() # empty tuple
+		if compiled_actions is None:
+			return super()._get_applicable_actions(atoms)
 
-		# Remove the nullary predicates from the action preconditions
-		action_preconds = [precond for precond in action_preconds if len(precond[2]) > 0]
+		applicable_actions = dict()
+		atoms_by_pred = compiled_actions.get_atoms_by_pred(atoms)
 
-		# Split the preconditions into positive and negative (i.e., (not ...))
-		positive_preconds = [precond for precond in action_preconds if precond[0]==True]
-		negative_preconds = [precond for precond in action_preconds if precond[0]==False]
+		for action in self.actions:
+			action_name, (action_vars, _), _, _ = action
+			match = compiled_actions.MATCHERS[action_name]
 
-		# List of (possibly partial) variable assignments corresponding to potentially aplicable actions
-		var_assigns = copy.deepcopy(_var_assigns) # Deep copy the parameter so that it is not modified
-		is_var_bound = [var != -1 for var in var_assigns[0]] # Contains True if the corresponding variable is bound, and False if it's free
+			if match is not None:
+				applicable_actions[action_name] = match(atoms, atoms_by_pred, self.object_types, self._objects_by_type)
+			else: # No code could be generated for the action schema
+				applicable_actions[action_name] = self._get_applicable_var_assigns_action(action, [[-1]*len(action_vars)], atoms)
 
-		# Process the positive preconditions -> obtain the list of variable assignments which satisfy the positive preconditions
-		for precond in positive_preconds:
-			_, precond_pred, precond_vars = precond
-			new_var_assigns = [] # Will contain the partial variable assignments after we process the current precondition (precond)
+		return applicable_actions
 
-			# Obtain mapping from the indexes of the atom's objects to the indexes of the variables in var_assigns
-			# Then, select the subset of those indexes which we need to check to see if an atom matches a variable assignment in var_assigns
-			# This subset corresponds to those variables which are already bound and also appear at the precondition (precond_vars)
-			"""
-			Examples:
-			- Precondition: ('in-city', (2, 3))
-			- Indexes of atom objects: (0, 1)
-			- Indexes of variables in var_assigns: (2, 3) -> atom_obj[0] maps to var[2] in var_assigns and atom_obj[1] maps to var[3]
+	# Same as _SuccessorGenerator._is_action_applicable, but using the generated code if the action schemas were compiled
+	def _is_action_applicable(self, atoms, action_name, var_assign):
+		compiled_actions = self._compiled_actions
+		check = compiled_actions.CHECKERS[action_name] if compiled_actions is not None else None
 
-			Let's assume we have var assignments like (6, 8, -1, 5) (vars 0, 1 and 3 are bound, and var 2 is free).
-			Then, we only need to check that atom_obj[1] matches var[3] in the var_assignments. Therefore:
-			- Indexes of atom objects to check: (1,)
-			- Indexes of variables in var_assigns to check: (3,)
-			"""
-			inds_to_check = [(ind, var) for ind, var in enumerate(precond_vars) if is_var_bound[var]]
+		if check is None: # The action schemas were not compiled or no code could be generated for the action schema
+			return super()._is_action_applicable(atoms, action_name, var_assign)
 
-			# If len(inds_to_check) == 0, this means that we don't have to check any variable in the assignments for this precondition
-			# i.e., as long as an atom is of the correct predicate and its objects of the correct type, all partial variable assignments match the atom
-			if len(inds_to_check) == 0:
-				no_vars_to_check = True
-				atom_obj_inds_to_check, vars_to_check = tuple(), tuple()
+		return check(atoms, var_assign, self.object_types, self._objects_by_type)
+
+	# Same as _SuccessorGenerator._get_next_state, but using the generated code if the action schemas were compiled
+	def _get_next_state(self, atoms, action_name, var_assign, check_action_applicability=True):
+		compiled_actions = self._compiled_actions
+
+		if compiled_actions is None:
+			return super()._get_next_state(atoms, action_name, var_assign, check_action_applicability)
+
+		if check_action_applicability and not self._is_action_applicable(atoms, action_name, var_assign):
+			return set(atoms)
+
+		return compiled_actions.APPLY_EFFECTS[action_name](atoms, var_assign)
+
+	"""
+	Returns the actions applicable at the current state, as a dictionary where keys are action names and values are tuples with the
+	variable assignments (groundings) which make each action applicable.
+
+	@prune_symmetries If True, only one ground action (the canonical one) is returned for each class of symmetric ground actions, i.e., those
+					  which only differ in objects which are interchangeable at the current state (see get_object_symmetry_groups()). Since
+					  symmetric ground actions lead to symmetric states, this reduces the branching factor without losing any solution.
+	"""
+	def get_applicable_actions(self, prune_symmetries=False):
+		cache = self._applicable_actions_cache
+
+		if cache is not None:
+			state_key = frozenset(self.atoms)
+			cache_entry = cache.get(state_key)
+
+			# Each entry contains the applicable actions at the state and, once they are needed, the applicable actions pruned
+			# by symmetries (so that the symmetry groups of the state are only computed once)
+			if cache_entry is None:
+				cache_entry = [self._get_applicable_actions(self.atoms), None]
+				cache.put(state_key, cache_entry)
+
+			if prune_symmetries:
+				if cache_entry[1] is None:
+					cache_entry[1] = self.prune_symmetric_actions(cache_entry[0])
+				applicable_actions = cache_entry[1]
 			else:
-				no_vars_to_check = False	
-				atom_obj_inds_to_check, vars_to_check = zip(*inds_to_check)
+				applicable_actions = cache_entry[0]
 
-			for atom in atoms:
-				atom_pred, atom_obj_inds = atom
+			return applicable_actions.copy() # Copy the dict so that the cached entry is not modified by the caller
 
-				# Check if the atom's predicate is the same as that of the precondition
-				if atom_pred == precond_pred:
-					# The types of the objects the atom is instantiated on must inherit from the type of the corresponding parameter type
-					types_correct = True
-					for atom_obj_ind, precond_var in zip(atom_obj_inds, precond_vars):
-						types_correct = types_correct and (objects[atom_obj_ind] in type_hierarchy[action_vars[precond_var]])
+		applicable_actions = self._get_applicable_actions(self.atoms)
 
-					if types_correct:
+		if prune_symmetries:
+			applicable_actions = self.prune_symmetric_actions(applicable_actions)
 
-						for var_assign in var_assigns:
-							# Check if the atom matches the current var assignment (var_assign)
-							# It is a match if the atom's objects match the objects of the corresponding vars in var_assign for those
-							# vars which are bound, i.e., atom_obj_inds[atom_obj_inds_to_check] == var_assign[vars_to_check]
-							if no_vars_to_check or itemgetter(*atom_obj_inds_to_check)(atom_obj_inds) == itemgetter(*vars_to_check)(var_assign):
-								new_var_assign = var_assign.copy()
-								deque(map(new_var_assign.__setitem__, precond_vars, atom_obj_inds), maxlen=0) # The deque is simply to evaluate the map, as in python 3 it has lazy evaluation
+		return applicable_actions
 
-								new_var_assigns.append(new_var_assign)
+	"""
+	Returns the groups of interchangeable objects at the state given by @atoms, as a tuple of tuples (only groups with
+	at least two objects are returned).
+	Two objects are interchangeable if they are of the same type, neither of them is a domain constant and swapping them
+	leaves both @atoms and the goals (self.goals) unchanged. Permuting the objects of a group is then a symmetry of the task,
+	which maps every ground action (and state) to a symmetric one.
+	The groups are obtained by first partitioning the objects with color refinement (i.e., objects get the same color if they
+	appear in the same positions of the same predicates together with objects of the same colors) and then checking that the
+	objects with the same color can actually be swapped. The returned groups are always correct (but, in some rare cases, some
+	interchangeable objects may not be detected as such).
+
+	@atoms Set of atoms, in the same format as self.atoms. If None, self.atoms is used.
+	"""
+	def get_object_symmetry_groups(self, atoms=None):
+		atoms = self.atoms if atoms is None else atoms
+		colors, atom_sets, occurrences = self._get_object_colors(atoms)
+
+		# <Verification>
+		# Objects with the same color are split into groups of objects which can be swapped with the first object of the group
+		# Note: if every object of a group can be swapped with the first one, then any permutation of the group is a symmetry
+		objects_by_color = dict()
+		for obj_ind, color in enumerate(colors):
+			objects_by_color.setdefault(color, []).append(obj_ind)
+
+		symmetry_groups = []
+
+		for color_objects in objects_by_color.values():
+			color_groups = []
+
+			for obj_ind in color_objects:
+				for group in color_groups:
+					if self._is_swap_symmetry(group[0], obj_ind, atom_sets, occurrences):
+						group.append(obj_ind)
+						break
+				else:
+					color_groups.append([obj_ind])
 
+			symmetry_groups.extend([tuple(group) for group in color_groups if len(group) > 1])
 
-			# Update the partial variable assignments
-			var_assigns = new_var_assigns
+		return tuple(sorted(symmetry_groups))
 
-			# If this happens, then the current precondition is not met for any variable substitution, so the action is not applicable!
-			if len(var_assigns) == 0:
-				return tuple() # empty tuple (no need to check the remaining preconditions)
+	# Auxiliary function used by get_object_symmetry_groups. It returns True if swapping objects @obj_1 and @obj_2 leaves
+	# every set of atoms in @atom_sets unchanged.
+	def _is_swap_symmetry(self, obj_1, obj_2, atom_sets, occurrences):
+		swap = {obj_1 : obj_2, obj_2 : obj_1}
 
-			# Bind variables which appear in the precondition
-			for var in precond_vars:
-				is_var_bound[var] = True
+		for set_ind, pred_name, _, obj_inds in chain(occurrences[obj_1], occurrences[obj_2]):
+			if (pred_name, tuple([swap.get(obj_ind, obj_ind) for obj_ind in obj_inds])) not in atom_sets[set_ind]:
+				return False
 
+		return True
 
-		# Check if there are still partial variable substitutions in var_assigns
-		# If there are, the free variables in those variable substitutions can be instantiated
-		# on any object of the correct type (they correspond to action parameters which don't appear in any precondition)	
-		partial_var_assigns = [var_assign for var_assign in var_assigns if -1 in var_assign]
-		full_var_assigns = [var_assign for var_assign in var_assigns if -1 not in var_assign]
+	"""
+	Auxiliary function used by get_object_symmetry_groups and get_canonical_state. It partitions the objects with color refinement
+	over the atoms in @atoms and the goals (self.goals), and returns a tuple (colors, atom_sets, occurrences), where:
+		- colors is a list with the color (an integer) of each object. Colors do not depend on the object indexes, only on the
+		  object types and the atoms each object appears in.
+		- atom_sets is a tuple (atoms, goals), where goals are encoded as atoms whose predicate is the tuple (is_true, pred_name)
+		- occurrences is a list which contains, for each object, the atoms it appears in, as tuples (set_ind, pred_name, pos, obj_inds)
+	"""
+	def _get_object_colors(self, atoms):
+		num_objects = len(self.object_names)
+		constant_names = set(self.constant_names)
+
+		# Encode the goals as atoms (where the predicate also contains whether the goal is positive or negative), so that
+		# both atoms and goals can be processed in the same way
+		atom_sets = (atoms, set([((is_true, pred_name), obj_inds) for is_true, pred_name, obj_inds in self.goals]))
+
+		# Occurrences of each object
+		occurrences = [[] for _ in range(num_objects)]
+		for set_ind, atom_set in enumerate(atom_sets):
+			for pred_name, obj_inds in atom_set:
+				for pos, obj_ind in enumerate(obj_inds):
+					occurrences[obj_ind].append((set_ind, pred_name, pos, obj_inds))
+
+		# Initial colors: object types. Each domain constant is given a different color, since they can't be permuted
+		# (they can appear in the action schemas).
+		colors = [(obj_type, name) if name in constant_names else (obj_type, '') for name, obj_type in zip(self.object_names, self.object_types)]
+		num_colors = -1
+
+		while True:
+			# str(pred_name) is used for sorting, since goal predicates are tuples and atom predicates are strings
+			signatures = [(colors[obj_ind], tuple(sorted([(set_ind, str(pred_name), pos, tuple([colors[o] for o in obj_inds])) \
+						  for set_ind, pred_name, pos, obj_inds in occurrences[obj_ind]]))) for obj_ind in range(num_objects)]
+
+			# Compress the signatures into integers. Colors are assigned in the order of the sorted signatures, so that they
+			# don't depend on the object indexes
+			color_ids = {signature : color_id for color_id, signature in enumerate(sorted(set(signatures)))}
+			colors = [color_ids[signature] for signature in signatures]
+
+			if len(color_ids) == num_colors: # The partition did not change
+				break
+			num_colors = len(color_ids)
 
-		for var_assign in partial_var_assigns:
-			# For each var in var_assign, we obtain a tuple with the objects which can be instantiated on it:
-			# If var == -1 -> a list with all the obj_inds of the corresponding action parameter type
-			# If var != -1 -> simply var
-			new_objs_var_assign = [[ind_obj for ind_obj, obj_type in enumerate(objects) if obj_type==action_vars[ind_var]] \
-			 					   if var==-1 else (var,) for ind_var, var in enumerate(var_assign)]
+		return colors, atom_sets, occurrences
 
-			new_var_assigns = product(*new_objs_var_assign) # Cartesian product
-			full_var_assigns.extend(new_var_assigns)
+	"""
+	Receives as @ground_actions the applicable actions in the dictionary form returned by get_applicable_actions() and returns
+	a new dictionary which only contains one ground action for each class of symmetric ground actions at the state given by @atoms.
+	The representative of each class is the ground action where the objects of each symmetry group are replaced, in order of first
+	appearance, by the objects of the group with the lowest indexes (e.g., if objects 3, 4 and 5 are interchangeable, ('load', (5, 3))
+	is replaced by ('load', (3, 4))).
 
+	@atoms Set of atoms, in the same format as self.atoms. If None, self.atoms is used.
+	"""
+	def prune_symmetric_actions(self, ground_actions, atoms=None):
+		symmetry_groups = self._get_state_symmetry_groups(self.atoms if atoms is None else atoms)
 
-		# <Negative preconditions>
-		# Remove the variable substitutions which do not satisfy the negative preconditions
-		for precond in negative_preconds: 
-			_, precond_pred, precond_vars = precond
-			new_var_assigns = []
+		if len(symmetry_groups) == 0:
+			return ground_actions
 
-			# Check if each var_assign meets the current negative precondition
-			for var_assign in full_var_assigns:
-				# Substitute the precondition variables by the objects given by var_assign
-				precond_objs = tuple([var_assign[var] for var in precond_vars])
-				ground_precond = (precond_pred, precond_objs)
+		obj_ranks = {obj_ind : (group_ind, rank) for group_ind, group in enumerate(symmetry_groups) for rank, obj_ind in enumerate(group)}
+		pruned_actions = dict()
 
-				# Check if the grounded precondition is in the state atoms
-				if ground_precond not in atoms:
-					new_var_assigns.append(var_assign)
+		for action_name, var_assigns in ground_actions.items():
+			pruned_actions[action_name] = tuple([var_assign for var_assign in var_assigns if self._is_canonical_var_assign(var_assign, obj_ranks)])
 
-			full_var_assigns = new_var_assigns
+		return pruned_actions
 
-			# If there are no var_assigns left, we know that no variable substitution
-			# satisfies all the preconditions
-			if len(full_var_assigns) == 0:
-				return tuple()
+	"""
+	Auxiliary function used by prune_symmetric_actions. It returns the same groups as get_object_symmetry_groups(@atoms), but
+	without running color refinement over all the objects, so that it is cheap enough to be called at every expanded state.
+	Two objects can only be interchangeable at @atoms if they are interchangeable according to the goals and object types, i.e., if they
+	belong to the same group of self._goal_symmetry_groups (computed once, when parsing the problem). Therefore, only those objects are
+	considered, and they are grouped by the atoms they appear in (where the object is replaced by -1 and the objects of its goal symmetry
+	group by -2). Objects which can be swapped always have the same atoms (up to the swap), so they end up in the same candidate group,
+	which is then verified as in get_object_symmetry_groups.
+	"""
+	def _get_state_symmetry_groups(self, atoms):
+		goal_group_inds = {obj_ind : group_ind for group_ind, group in enumerate(self._goal_symmetry_groups) for obj_ind in group}
 
+		if len(goal_group_inds) == 0:
+			return tuple()
 
-		# <Existential preconditions>
-		# Remove variables corresponding to existential preconditions from full_var_assigns.
-		# We do this because these variables are not action parameters and we know that, for all variable assignments in
-		# full_var_assigns, the existential preconditions are met.
-		# Example: if the second variable is introduced by an existential precondition, then:
-		# 		   full_var_assigns = [[1,2,3], [4,5,6], [1,7,3]] -> [[1,3], [4,6], [1,3]] --- 
-		#          -- <remove repeated assignments> ---> [[1,3], [4,6]]
-		exists_vars = set([var for var, var_class in enumerate(vars_class) if var_class == 'exists'])
+		signatures = {obj_ind : [] for obj_ind in goal_group_inds}
+		occurrences = {obj_ind : [] for obj_ind in goal_group_inds}
 
-		# Also, convert from list of lists to tuple of tuples
-		# set() used to remove repeated assignments
-		full_var_assigns = tuple(set([tuple([elem for ind, elem in enumerate(var_assign) if ind not in exists_vars]) for var_assign in full_var_assigns]))
+		for atom in atoms:
+			pred_name, obj_inds = atom
 
-		return full_var_assigns
+			for pos, obj_ind in enumerate(obj_inds):
+				group_ind = goal_group_inds.get(obj_ind)
 
+				if group_ind is not None:
+					signatures[obj_ind].append((pred_name, tuple([-1 if other_obj_ind == obj_ind else (-2 if goal_group_inds.get(other_obj_ind) == group_ind else other_obj_ind) for other_obj_ind in obj_inds])))
+					occurrences[obj_ind].append((0, pred_name, pos, obj_inds))
 
-	def get_applicable_actions(self):
-		applicable_actions = dict()
+		candidate_groups = dict()
+		for obj_ind, group_ind in goal_group_inds.items():
+			candidate_groups.setdefault((group_ind, tuple(sorted(signatures[obj_ind]))), []).append(obj_ind)
 
-		action_schemas = self.actions
+		# Verify the candidate groups (only the atoms need to be checked, since the goals are preserved within each goal symmetry group)
+		# If the objects of a candidate group don't appear in atoms together with other objects of their goal symmetry group (i.e., their
+		# signature does not contain -2), swapping two of them maps the atoms of one to the atoms of the other, so they don't need to be verified
+		atom_sets = (atoms,)
+		symmetry_groups = []
 
-		for action in action_schemas:
-			action_name, action_var_info, action_preconds, _ = action
-			action_vars, vars_class = action_var_info
+		for (_, signature), candidate_objects in candidate_groups.items():
+			if len(candidate_objects) > 1 and all(-2 not in obj_inds for _, obj_inds in signature):
+				symmetry_groups.append(tuple(sorted(candidate_objects)))
+				continue
 
-			full_var_assigns = self._get_applicable_var_assigns_action(action, [[-1]*len(action_vars)])
+			groups = []
 
-			# Save the variable assignments (groundings) which make the current action applicable
-			applicable_actions[action_name] = full_var_assigns
+			for obj_ind in sorted(candidate_objects):
+				for group in groups:
+					if self._is_swap_symmetry(group[0], obj_ind, atom_sets, occurrences):
+						group.append(obj_ind)
+						break
+				else:
+					groups.append([obj_ind])
 
-		return applicable_actions
+			symmetry_groups.extend([tuple(group) for group in groups if len(group) > 1])
 
-	"""
-	This method receives a ground action and returns if it is applicable at the current state (given by self.object_names, self.object_types and self.atoms).
+		return tuple(sorted(symmetry_groups))
 
-	@action_name Name of the action (e.g., 'drive')
-	@var_assign Action parameters instantiations, as a list/tuple of object indexes (e.g., (10, 3) -> first action parameter is instantiated on 10-th object 
-	            and the second one on the third object)
-	"""
-	def is_action_applicable(self, action_name, var_assign):
-		action_schemas = self.actions
-		type_hierarchy = self.type_hierarchy
-		objects = self.object_types
-		atoms = self.atoms # Note: atoms must be a set of tuples and not a set of lists
+	# Auxiliary function used by prune_symmetric_actions. It returns True if @var_assign is the canonical variable assignment of its class,
+	# i.e., if the objects of each symmetry group appear, in order of first appearance, as the members of the group with the lowest indexes.
+	# @obj_ranks maps each object of a symmetry group to the tuple (group_ind, position of the object in the group).
+	def _is_canonical_var_assign(self, var_assign, obj_ranks):
+		num_used = dict() # Number of distinct objects of each group seen so far
 
-		# Select the action_schema corresponding to @action_name
-		action = [action_schema for action_schema in action_schemas if action_schema[0]==action_name]
-		assert len(action)==1, "There are several action schemas with the same name!"
-		action = action[0]
+		for obj_ind in var_assign:
+			obj_rank = obj_ranks.get(obj_ind)
 
-		action_name, action_var_info, action_preconds, action_effects = action
-		action_vars, vars_class = action_var_info
+			if obj_rank is not None:
+				group_ind, rank = obj_rank
+				used = num_used.get(group_ind, 0)
 
-		# Obtain the action parameters, i.e., those variables of class 'param'
-		action_params = [var for var, var_class in zip(action_vars, vars_class) if var_class == 'param']
+				if rank > used: # A member of the group with a lower index should have appeared first
+					return False
+				if rank == used: # First appearance of the object (objects with rank < used have already appeared)
+					num_used[group_ind] = used + 1
 
-		assert len(var_assign) == len(action_params), "The number of variables in var_assign must be the same that the name of action parameters."
+		return True
 
-		# Check if the objects the action parameters are instantiated on are of the correct type
-		for obj_ind, param_type in zip(var_assign, action_params):
-			if objects[obj_ind] not in type_hierarchy[param_type]:
-				return False # If a single parameter is of the incorrect type, we know the action is not applicable
+	"""
+	Returns a canonical representation of the state given by @atoms, as a frozenset of atoms. Symmetric states, i.e., those which
+	are equal up to a permutation of interchangeable objects (according to the goals and object types), usually have the same canonical
+	representation, so it can be used for duplicate detection during search.
+	The canonical state is obtained by sorting the objects of each symmetry group according to their colors (obtained with color refinement
+	over @atoms and the goals) and renaming them accordingly. The canonical state is always symmetric to @atoms, but some symmetric states
+	(those where color refinement can't tell apart the objects of a group) may be given different canonical representations.
+
+	@atoms Set of atoms, in the same format as self.atoms. If None, self.atoms is used.
+	"""
+	def get_canonical_state(self, atoms=None):
+		atoms = self.atoms if atoms is None else atoms
+		symmetry_groups = self._goal_symmetry_groups
 
-		# Add free variables to @var_assign, accounting for the variables in existential preconditions
-		num_exist_vars = vars_class.count('exists')
-		var_assigns = [list(var_assign) + [-1]*num_exist_vars] # Note: we know that vars corresponding to existential preconditions go after vars corresponding to action params
+		if len(symmetry_groups) == 0:
+			return frozenset(atoms)
 
-		# Obtain all the variable instantiations where the bind variables correspond to the variables in @var_assign
-		# and the free variables correspond to the variables given by existential preconditions
-		full_var_assigns = self._get_applicable_var_assigns_action(action, var_assigns)
+		colors, _, _ = self._get_object_colors(atoms)
 
-		# If the action is applicable, there will be at least one valid variable assignment in full_var_assigns
-		return len(full_var_assigns) > 0
+		# Rename the objects of each group, so that they are sorted by color
+		mapping = dict()
+		for group in symmetry_groups:
+			sorted_group = sorted(group, key=lambda obj_ind: (colors[obj_ind], obj_ind))
+			mapping.update(zip(sorted_group, group))
+
+		return frozenset([(pred_name, tuple([mapping.get(obj_ind, obj_ind) for obj_ind in obj_inds])) for pred_name, obj_inds in atoms])
+
+	"""
+	This method receives a ground action and returns if it is applicable at the current state (given by self.object_names, self.object_types and self.atoms).
+
+	@action_name Name of the action (e.g., 'drive')
+	@var_assign Action parameters instantiations, as a list/tuple of object indexes (e.g., (10, 3) -> first action parameter is instantiated on 10-th object 
+	            and the second one on the third object)
+	"""
+	def is_action_applicable(self, action_name, var_assign):
+		return self._is_action_applicable(self.atoms, action_name, var_assign)
 
 	"""
 	Successor function.
@@ -546,51 +1378,60 @@ class Parser:
 	            and the second one on the third object)
 	"""
 	def get_next_state(self, action_name, var_assign, check_action_applicability=True):
-		action_schemas = self.actions
-		type_hierarchy = self.type_hierarchy
-		objects = self.object_types
-		atoms = self.atoms # Note: atoms must be a set of tuples and not a set of lists
+		cache = self._next_state_cache
 
-		# Select the action_schema corresponding to @action_name
-		action = [action_schema for action_schema in action_schemas if action_schema[0]==action_name]
-		assert len(action)==1, "There are several action schemas with the same name!"
-		action = action[0]
+		if cache is not None:
+			key = (frozenset(self.atoms), action_name, tuple(var_assign), check_action_applicability)
+			next_state = cache.get(key)
 
-		# Copy the atoms, so that the new_atoms don't share the reference
-		new_atoms = atoms.copy()
+			if next_state is None:
+				next_state = frozenset(self._get_next_state(self.atoms, action_name, var_assign, check_action_applicability))
+				cache.put(key, next_state)
 
-		if check_action_applicability:
-			is_applicable = self.is_action_applicable(action_name, var_assign)
+			return set(next_state) # The successor is returned as a new set, so that the cached entry is not modified by the caller
 
-			# If the action is not applicable, the set of atoms will not change (the state remains the same)
-			if not is_applicable:
-				return new_atoms
+		return self._get_next_state(self.atoms, action_name, var_assign, check_action_applicability)
 
-		# Perform the variable substitutions for the action_effects (i.e., ground the variables) according to @var_assign
-		_, action_var_info, action_preconds, action_effects = action
-		action_vars, vars_class = action_var_info
+	"""
+	Auxiliary function used to encode atoms, actions and problems in PDDL format. It returns a tuple (obj_frags, pred_frags, action_frags, objects_section)
+	with precomputed string fragments, so that they don't need to be rebuilt every time an atom or action is encoded:
+		- obj_frags is a list with the name of each object preceded by a blank space (e.g., ' t1')
+		- pred_frags and action_frags are dictionaries which map each predicate and action name to its name preceded by '(' (e.g., '(at')
+		- objects_section is the (:objects ...) section of the PDDL problem
+	The fragments are computed the first time they are needed and recomputed whenever a new domain or problem is parsed, irrelevant
+	objects are pruned or self.object_names or self.object_types are replaced by other lists. If these lists are modified in place,
+	invalidate_pddl_fragments() must be called.
+	"""
+	def _get_pddl_fragments(self):
+		object_names, object_types = self.object_names, self.object_types
 
-		ground_action_effects = []
-		for effect in action_effects:
-			ground_vars = tuple([var_assign[var] for var in effect[2]])
-			ground_effect = tuple([effect[0], effect[1], ground_vars])
-			ground_action_effects.append(ground_effect)
+		# The lists are compared by identity (instead of by content), so that checking the fragments takes constant time
+		if self._pddl_fragments is None or self._pddl_fragments[0] is not object_names or self._pddl_fragments[1] is not object_types:
+			obj_frags = [' ' + name for name in object_names]
+			pred_frags = {pred[0] : '(' + pred[0] for pred in self.predicates}
+			action_frags = {action[0] : '(' + action[0] for action in self.actions}
 
-		# Apply the ground effects:
-		# Add effects (effect[0]==True) -> add the corresponding atom
-		# Del effects (effect[0]==False) -> delete the corresponding atom
-		# Note: we assume that no effects are in both the add and delete list
-		for effect in ground_action_effects:
-			effect_atom = (effect[1], effect[2])
+			# Get objects of each type - From ['block', 'block', 'circle'] to {'block': ['A','B'], 'circle':['C']}
+			object_types_dict = dict()
 
-			if effect[0]: # Add effect		
-				if effect_atom not in new_atoms: # If the corresponding atom does already exist in the state atoms, we do nothing
-					new_atoms.add(effect_atom)
-			else: # Delete effect
-				if effect_atom in new_atoms: # If the corresponding atom does not exist in the state atoms, we do nothing
-					new_atoms.remove(effect_atom)
+			for name, t in zip(object_names, object_types):
+				if t in object_types_dict:
+					object_types_dict[t].append(name)
+				else:
+					object_types_dict[t] = [name]
 
-		return new_atoms
+			objects_section = '(:objects\n' + ''.join(['\t' + ''.join([f'{name} ' for name in object_types_dict[key]]) + f'- {key}\n' for key in object_types_dict]) + ')\n\n'
+
+			self._pddl_fragments = (object_names, object_types, (obj_frags, pred_frags, action_frags, objects_section))
+
+		return self._pddl_fragments[2]
+
+	"""
+	Discards the precomputed fragments used to encode atoms, actions and problems in PDDL format, so that they are recomputed the
+	next time they are needed. It must be called after modifying self.object_names or self.object_types in place.
+	"""
+	def invalidate_pddl_fragments(self):
+		self._pddl_fragments = None
 
 	"""
 	Receives as @ground_actions the set of applicable actions in the dictonary form returned by get_applicable_actions()
@@ -613,7 +1454,8 @@ class Parser:
 			actions_pddl_format = set([tuple([action_name] + [obj_names[var] for var in var_assign]) for action_name in ground_actions \
 								   for var_assign in ground_actions[action_name]])
 		else:
-			actions_pddl_format = set(['({} '.format(action_name) + ' '.join(obj_names[var] for var in var_assign) + ')' \
+			obj_frags, _, action_frags, _ = self._get_pddl_fragments()
+			actions_pddl_format = set([action_frags.get(action_name, '(' + action_name) + ''.join([obj_frags[var] for var in var_assign]) + ')' \
 			                       for action_name in ground_actions for var_assign in ground_actions[action_name]])
 
 		return actions_pddl_format
@@ -640,92 +1482,114 @@ class Parser:
 		if output_format == 'tuple':
 			atoms_pddl_format = set([tuple([atom[0]] + [obj_names[obj_ind] for obj_ind in atom[1]]) for atom in atoms])
 		else:
-			atoms_pddl_format = set(['({} '.format(atom[0]) + ' '.join(obj_names[obj_ind] for obj_ind in atom[1]) + ')' \
-									 if len(atom[1]) > 0 else '({})'.format(atom[0]) for atom in atoms])
-								# We need the if else condition in the list comprehension because, without it,
-								# atoms corresponding to nullary predicates are printed with a blank space at the end
-								# (e.g., (handempty ) <- note the blank space)
+			# Each object fragment already contains the blank space which precedes it, so atoms corresponding to
+			# nullary predicates are encoded without a blank space at the end (e.g., (handempty))
+			obj_frags, pred_frags, _, _ = self._get_pddl_fragments()
+			atoms_pddl_format = set([pred_frags.get(atom[0], '(' + atom[0]) + ''.join([obj_frags[obj_ind] for obj_ind in atom[1]]) + ')' for atom in atoms])
 
 		return atoms_pddl_format
 
 	"""
-	This method returns the PDDL encoding of the problem stored in the parser.
-
-	@problem_name Name of the PDDL problem to output
+	Writes the atoms in @atoms (in the form returned by get_next_state()) to the file-like object @file in PDDL format,
+	one atom per line (e.g., '(at t1 l2)\n'). Each line is preceded by @line_prefix.
+	Unlike encode_atoms_as_pddl(), the atoms are streamed to @file instead of being stored in a new set.
 	"""
-	def dump_pddl_problem(self, problem_name):
-		# <Definition (and problem name)>
-		pddl_problem = f"(define (problem {problem_name})\n\n"
+	def write_atoms_as_pddl(self, atoms, file, line_prefix=''):
+		obj_frags, pred_frags, _, _ = self._get_pddl_fragments()
+		pred_frags = {pred_name : line_prefix + pred_frag for pred_name, pred_frag in pred_frags.items()}
+		default_prefix = line_prefix + '('
 
-		# <Domain name>
-		pddl_problem += f'(:domain {self.domain_name})\n\n'
+		file.writelines([(pred_frags.get(pred_name) or default_prefix + pred_name) + ''.join([obj_frags[obj_ind] for obj_ind in obj_inds]) + ')\n' \
+						 for pred_name, obj_inds in atoms])
 
-		# <Objects>
+	"""
+	Writes the ground actions in @ground_actions (in the dictionary form returned by get_applicable_actions()) to the file-like
+	object @file in PDDL format, one action per line (e.g., '(drive t1 l2 l3 c1)\n').
+	"""
+	def write_ground_actions_as_pddl(self, ground_actions, file):
+		obj_frags, _, action_frags, _ = self._get_pddl_fragments()
 
-		# Begin :objects
-		pddl_problem += '(:objects\n'
+		for action_name, var_assigns in ground_actions.items():
+			action_frag = action_frags.get(action_name, '(' + action_name)
+			file.writelines([action_frag + ''.join([obj_frags[var] for var in var_assign]) + ')\n' for var_assign in var_assigns])
 
-		# Get objects of each type - From ['block', 'block', 'circle'] to {'block': ['A','B'], 'circle':['C']}
-		object_types_dict = dict()
+	"""
+	Writes several states to the file-like object @file in PDDL format, one state per line. Each line contains the atoms of
+	the state separated by a blank space (e.g., '(at t1 l2) (in p1 t1)\n').
+	@states can be any iterable (e.g., a generator) of sets of atoms. States are written one at a time, so memory usage
+	does not grow with the number of states.
+	"""
+	def write_states_as_pddl(self, states, file):
+		obj_frags, pred_frags, _, _ = self._get_pddl_fragments()
 
-		for name, t in zip(self.object_names, self.object_types):
-			if t in object_types_dict:
-				object_types_dict[t].append(name)
-			else:
-				object_types_dict[t] = [name]
+		for atoms in states:
+			file.write(' '.join([pred_frags.get(pred_name, '(' + pred_name) + ''.join([obj_frags[obj_ind] for obj_ind in obj_inds]) + ')' \
+								 for pred_name, obj_inds in atoms]) + '\n')
 
-		for key in object_types_dict:
-			pddl_problem += '\t'
+	"""
+	Writes the PDDL encoding of the problem stored in the parser to the file-like object @file.
+	The encoding is the same as the one returned by dump_pddl_problem(), but it is streamed to @file section by section.
 
-			for name in object_types_dict[key]:
-				pddl_problem += f'{name} '
+	@problem_name Name of the PDDL problem to output
+	@atoms Atoms of the initial state. If None, self.atoms is used.
+	@goals Goals of the problem, in the same format as self.goals. If None, self.goals is used.
+	"""
+	def write_pddl_problem(self, file, problem_name, atoms=None, goals=None):
+		obj_frags, pred_frags, _, objects_section = self._get_pddl_fragments()
+		atoms = self.atoms if atoms is None else atoms
+		goals = self.goals if goals is None else goals
 
-			pddl_problem += f'- {key}\n'
+		# <Definition (and problem name)> and <Domain name>
+		file.write(f"(define (problem {problem_name})\n\n(:domain {self.domain_name})\n\n")
 
-		# End :objects
-		pddl_problem += ')\n\n'
+		# <Objects>
+		file.write(objects_section)
 
 		# <Initial state atoms (:init)>
-
-		# Begin :init
-		pddl_problem += '(:init\n'
-
-		# Add each atom of the initial state
-		for atom in self.atoms:
-			pddl_problem += f'\t({atom[0]}'
-
-			for obj_ind in atom[1]:
-				pddl_problem += f' {self.get_object_name(obj_ind)}'
-
-			pddl_problem += ')\n'
-
-		# End :init
-		pddl_problem +=')\n\n'
+		file.write('(:init\n')
+		self.write_atoms_as_pddl(atoms, file, line_prefix='\t')
+		file.write(')\n\n')
 
 		# <Goal atoms (:goal)>
+		file.write('(:goal (and\n')
 
-		# Begin :goal
+		for is_true, pred_name, obj_inds in goals:
+			cond_str = pred_frags.get(pred_name, '(' + pred_name) + ''.join([obj_frags[obj_ind] for obj_ind in obj_inds]) + ')'
 
-		pddl_problem += '(:goal (and\n'
-
-		# Add goal atoms
-		for cond in self.goals:
-			cond_str = f"({cond[1]} " + ' '.join(self.get_object_name(obj_ind) for obj_ind in cond[2]) + ')' if len(cond[2]) > 0 else \
-					   f"({cond[1]})"
-
-			if cond[0] is False: # Negative goal condition -> we add "(not ...)"
+			if is_true is False: # Negative goal condition -> we add "(not ...)"
 				cond_str = f"(not {cond_str})"
 
-			pddl_problem += f"\t{cond_str}\n"
+			file.write(f"\t{cond_str}\n")
 
-		# End :goal
-		pddl_problem += '))\n'
+		file.write('))\n')
 
 		# <End>
-		pddl_problem += ")"
+		file.write(")")
+
+	"""
+	Bulk version of write_pddl_problem(). It receives an iterable @problems (e.g., a generator) of tuples (problem_name, atoms, goals)
+	and writes each problem to the file given by @path_template.format(problem_name) (e.g., 'problems/{}.pddl').
+	atoms and goals can be None, in which case self.atoms and self.goals are used, respectively.
+	Problems are written one at a time and the precomputed fragments (objects section, object names, etc.) are shared among them,
+	so memory usage does not grow with the number of problems.
+	"""
+	def write_pddl_problems(self, problems, path_template):
+		for problem_name, atoms, goals in problems:
+			with open(path_template.format(problem_name), 'w') as file:
+				self.write_pddl_problem(file, problem_name, atoms, goals)
+
+	"""
+	This method returns the PDDL encoding of the problem stored in the parser.
+	To write the problem to a file, use write_pddl_problem() instead.
+
+	@problem_name Name of the PDDL problem to output
+	"""
+	def dump_pddl_problem(self, problem_name):
+		pddl_problem = io.StringIO()
+		self.write_pddl_problem(pddl_problem, problem_name)
 
 		# <<Return the PDDL problem>>
-		return pddl_problem
+		return pddl_problem.getvalue()
 
 
 
@@ -0,0 +1,273 @@
+from array import array
+from itertools import chain
+from multiprocessing import resource_tracker, shared_memory
+import json
+import mmap
+import struct
+import sys
+
+from lifted_pddl.task import _TaskSuccessorGenerator
+
+"""
+Binary layout of a compiled task, used to share a Task among several processes (through multiprocessing.shared_memory or
+an mmap'ed file) without re-parsing or unpickling it in every process.
+
+The layout consists of a header followed by several sections (each one aligned to 8 bytes):
+	- Header: magic string (8 bytes), layout version (uint32), byte order of the int32 arrays ('<' or '>', 1 byte), 3 padding bytes
+	  and the (offset, length) in bytes of each section (uint64 pairs). The header is always little-endian.
+	- Section 0: metadata (UTF-8 JSON) with the domain information (types, type hierarchy, predicates, constants and action schemas)
+	  and the number of objects. Type names are encoded as type ids (their index in the sorted list of types).
+	- Section 1: type id of each object (int32 array)
+	- Section 2: offsets of the name of each object in section 3, plus the final offset (int32 array)
+	- Section 3: object names (UTF-8)
+	- Section 4: initial state atoms, as a flat int32 array where each atom is encoded as its predicate id followed by its objects
+	- Section 5: goals, as a flat int32 array where each goal is encoded as is_true (0 or 1), its predicate id and its objects
+"""
+_MAGIC = b'LPDDLTSK'
+_VERSION = 1
+_NUM_SECTIONS = 6
+_HEADER_FORMAT = '<8sIc3x' + 'QQ'*_NUM_SECTIONS
+_HEADER_SIZE = struct.calcsize(_HEADER_FORMAT)
+_BYTE_ORDER = b'<' if sys.byteorder == 'little' else b'>'
+
+# Names of the shared memory blocks created by this process (or its parent, if it was forked) with SharedTask.create_shared_memory()
+_created_shared_memory_names = set()
+
+"""
+Encodes the Task @task in the binary layout described above and returns it as a bytes object.
+"""
+def encode_task(task):
+	types = sorted(task.types)
+	type_ids = {type_name : type_id for type_id, type_name in enumerate(types)}
+
+	# Predicates, as a list with their names. Atoms and goals store the predicate index in this list.
+	predicates = sorted(task.predicates)
+	pred_arities = {pred_name : len(pred_types) for pred_name, pred_types in predicates}
+	for pred_name, obj_inds in chain(task.init, [(pred_name, obj_inds) for _, pred_name, obj_inds in task.goals]):
+		pred_arities.setdefault(pred_name, len(obj_inds))
+	pred_names = sorted(pred_arities)
+	pred_ids = {pred_name : pred_id for pred_id, pred_name in enumerate(pred_names)}
+
+	metadata = {'domain_name': task.domain_name,
+				'types': types,
+				'type_hierarchy': [[type_ids[child] for child in sorted(task.type_hierarchy[type_name])] for type_name in types],
+				'predicates': [[pred_name, list(pred_types)] for pred_name, pred_types in predicates],
+				'pred_names': pred_names,
+				'pred_arities': [pred_arities[pred_name] for pred_name in pred_names],
+				'constant_names': list(task.constant_names),
+				'constant_types': list(task.constant_types),
+				'actions': [[action_name, [type_ids[var_type] for var_type in action_vars], list(vars_class), [list(precond) for precond in preconds],
+							 [list(effect) for effect in effects]] for action_name, (action_vars, vars_class), preconds, effects in sorted(task.actions)],
+				'num_objects': len(task.object_names)}
+
+	# Object names
+	names_blob = bytearray()
+	name_offsets = array('i', [0])
+	for name in task.object_names:
+		names_blob += name.encode('utf-8')
+		name_offsets.append(len(names_blob))
+
+	init_atoms = array('i')
+	for pred_name, obj_inds in task.init:
+		init_atoms.append(pred_ids[pred_name])
+		init_atoms.extend(obj_inds)
+
+	goals = array('i')
+	for is_true, pred_name, obj_inds in task.goals:
+		goals.extend((int(is_true), pred_ids[pred_name]))
+		goals.extend(obj_inds)
+
+	sections = [json.dumps(metadata).encode('utf-8'), array('i', [type_ids[obj_type] for obj_type in task.object_types]).tobytes(),
+				name_offsets.tobytes(), bytes(names_blob), init_atoms.tobytes(), goals.tobytes()]
+
+	# Compute the offset of each section (aligned to 8 bytes)
+	section_table = []
+	offset = _HEADER_SIZE
+	for section in sections:
+		offset += -offset % 8
+		section_table.extend((offset, len(section)))
+		offset += len(section)
+
+	output = bytearray(offset)
+	output[:_HEADER_SIZE] = struct.pack(_HEADER_FORMAT, _MAGIC, _VERSION, _BYTE_ORDER, *section_table)
+	for section_ind, section in enumerate(sections):
+		section_offset = section_table[2*section_ind]
+		output[section_offset:section_offset+len(section)] = section
+
+	return bytes(output)
+
+"""
+This class provides the same stateless successor API as Task (get_applicable_actions(), is_action_applicable(), get_next_state()
+and is_goal_state()), but reads the task directly from a buffer in the binary layout returned by encode_task(), instead of storing
+it in Python objects. The buffer can be a bytes object, a multiprocessing.shared_memory.SharedMemory block or an mmap'ed file, so that
+several processes can attach to the same task without copying it.
+
+Only the (small) domain information is decoded when attaching to the buffer. The type of each object is read from the buffer
+without copying it, and the object names and initial state are only decoded if they are accessed.
+Object types are represented by their type ids (instead of their names) in self.object_types, self.type_hierarchy and the action schemas.
+
+Example:
+	# Main process
+	shm = SharedTask.create_shared_memory(parser.compile_task())
+
+	# Worker processes
+	task = SharedTask.from_shared_memory(shm.name)
+	applicable_actions = task.get_applicable_actions(task.init)
+	task.close()
+
+	# Main process, once the workers have finished
+	shm.close()
+	shm.unlink()
+
+<Note>: only the process which created the shared memory block must unlink it. Workers only close it, since attaching to the block with
+from_shared_memory() does not register it to be unlinked when the worker exits.
+"""
+class SharedTask(_TaskSuccessorGenerator):
+
+	def __init__(self, buffer):
+		self._buffer = memoryview(buffer)
+		self._owner = None # SharedMemory or mmap object which must be closed when closing the task, if any
+
+		magic, version, byte_order, *section_table = struct.unpack_from(_HEADER_FORMAT, self._buffer)
+		assert magic == _MAGIC, "@buffer does not contain a task encoded by encode_task()"
+		assert version == _VERSION, "The task was encoded with a different version of the layout"
+		assert byte_order == _BYTE_ORDER, "The task was encoded on a machine with a different byte order"
+
+		self._sections = [self._buffer[section_table[2*ind]:section_table[2*ind]+section_table[2*ind+1]] for ind in range(_NUM_SECTIONS)]
+
+		# Domain information
+		metadata = json.loads(bytes(self._sections[0]).decode('utf-8'))
+
+		self.domain_name = metadata['domain_name']
+		self.types = tuple(metadata['types']) # The type id of each type is its index in this tuple
+		self.type_hierarchy = {type_id : frozenset(children) for type_id, children in enumerate(metadata['type_hierarchy'])}
+		self.predicates = frozenset([(pred_name, tuple(pred_types)) for pred_name, pred_types in metadata['predicates']])
+		self.constant_names = tuple(metadata['constant_names'])
+		self.constant_types = tuple(metadata['constant_types'])
+		self.actions = frozenset([(action_name, (tuple(action_vars), tuple(vars_class)), tuple([(precond[0], precond[1], tuple(precond[2])) for precond in preconds]),
+								   tuple([(effect[0], effect[1], tuple(effect[2])) for effect in effects])) \
+								   for action_name, action_vars, vars_class, preconds, effects in metadata['actions']])
+		self._action_schemas = {action[0] : action for action in self.actions}
+		self._pred_names = metadata['pred_names']
+		self._pred_arities = metadata['pred_arities']
+		self.num_objects = metadata['num_objects']
+
+		# Problem information (read directly from the buffer)
+		self.object_types = self._sections[1].cast('i')
+		self._name_offsets = self._sections[2].cast('i')
+
+		self._init = None
+		self.goals = frozenset([(bool(is_true), pred_name, obj_inds) for is_true, (pred_name, obj_inds) in self._decode_atoms(self._sections[5], True)])
+
+	"""
+	Attaches to the task stored in the shared memory block named @name (see create_shared_memory()).
+	The block is not unlinked when this process exits (only its creator must unlink it).
+	"""
+	@classmethod
+	def from_shared_memory(cls, name):
+		try:
+			shm = shared_memory.SharedMemory(name=name, track=False) # Python >= 3.13: the block is not registered in the resource tracker
+		except TypeError:
+			# Python < 3.13: attaching to the block registers it in the resource tracker of this process, which would unlink it when
+			# the process exits (even though other processes are still using it), so we unregister it. This is not done for the blocks
+			# created by this process, since they share the resource tracker with their creator (and must remain registered in it).
+			shm = shared_memory.SharedMemory(name=name)
+			if shm._name not in _created_shared_memory_names:
+				resource_tracker.unregister(shm._name, 'shared_memory')
+
+		task = cls(shm.buf)
+		task._owner = shm
+
+		return task
+
+	# Attaches to the task stored in the file @path (see write_file()), by mapping it in memory
+	@classmethod
+	def from_file(cls, path):
+		with open(path, 'rb') as file:
+			mapped_file = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+		task = cls(mapped_file)
+		task._owner = mapped_file
+
+		return task
+
+	"""
+	Encodes @task (a Task) and stores it in a new shared memory block, which is returned.
+	The caller is responsible for closing and unlinking the block once it is no longer needed.
+
+	@name Name of the shared memory block. If None, a random name is used.
+	"""
+	@staticmethod
+	def create_shared_memory(task, name=None):
+		encoded_task = encode_task(task)
+
+		shm = shared_memory.SharedMemory(name=name, create=True, size=len(encoded_task))
+		shm.buf[:len(encoded_task)] = encoded_task
+		_created_shared_memory_names.add(shm._name)
+
+		return shm
+
+	# Encodes @task (a Task) and writes it to the file @path
+	@staticmethod
+	def write_file(task, path):
+		with open(path, 'wb') as file:
+			file.write(encode_task(task))
+
+	# Releases the buffer. If the task was obtained with from_shared_memory() or from_file(), the shared memory block or file is also closed.
+	def close(self):
+		# Memoryviews must be released before closing the shared memory block or mmap
+		self.object_types.release()
+		self._name_offsets.release()
+		for section in self._sections:
+			section.release()
+		self._buffer.release()
+
+		if self._owner is not None:
+			self._owner.close()
+			self._owner = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+	# Auxiliary function which decodes the atoms (or goals, if @is_goal is True) stored in the flat int32 array @section
+	def _decode_atoms(self, section, is_goal=False):
+		values = section.cast('i')
+		pred_names = self._pred_names
+		pred_arities = self._pred_arities
+		atoms = []
+		ind = 0
+
+		while ind < len(values):
+			if is_goal:
+				is_true = values[ind]
+				ind += 1
+
+			pred_id = values[ind]
+			arity = pred_arities[pred_id]
+			atom = (pred_names[pred_id], tuple(values[ind+1:ind+1+arity]))
+			atoms.append((is_true, atom) if is_goal else atom)
+			ind += 1 + arity
+
+		values.release()
+
+		return atoms
+
+	# Initial state of the task, as a frozenset of atoms. It is decoded the first time it is accessed.
+	@property
+	def init(self):
+		if self._init is None:
+			self._init = frozenset(self._decode_atoms(self._sections[4]))
+
+		return self._init
+
+	# Returns the name of the object whose index is @obj_ind
+	def get_object_name(self, obj_ind):
+		return bytes(self._sections[3][self._name_offsets[obj_ind]:self._name_offsets[obj_ind+1]]).decode('utf-8')
+
+	# Names of all the objects, as a tuple
+	@property
+	def object_names(self):
+		return tuple([self.get_object_name(obj_ind) for obj_ind in range(self.num_objects)])
@@ -0,0 +1,104 @@
+from types import MappingProxyType
+
+from lifted_pddl.parser import _SuccessorGenerator
+
+"""
+Stateless successor API shared by Task and SharedTask. Its methods receive the state as a parameter (as a set or frozenset of atoms, in
+the same format as Parser.atoms) instead of reading it from self.
+Subclasses must define self._action_schemas (a dictionary which maps each action name to its schema) and self.goals, besides the
+attributes required by _SuccessorGenerator.
+"""
+class _TaskSuccessorGenerator(_SuccessorGenerator):
+
+	__slots__ = ()
+
+	# Returns the action schema whose name is @action_name
+	def _get_action_schema(self, action_name):
+		return self._action_schemas[action_name]
+
+	"""
+	Returns the actions applicable at @state, as a dictionary where keys are action names and values are tuples with the
+	variable assignments (groundings) which make each action applicable (same format as Parser.get_applicable_actions()).
+	"""
+	def get_applicable_actions(self, state):
+		return self._get_applicable_actions(state)
+
+	"""
+	Returns True if the ground action given by @action_name and @var_assign is applicable at @state (see Parser.is_action_applicable()).
+	"""
+	def is_action_applicable(self, state, action_name, var_assign):
+		return self._is_action_applicable(state, action_name, var_assign)
+
+	"""
+	Successor function.
+	Returns the state (as a frozenset of atoms) resulting from applying the ground action given by @action_name and @var_assign at @state.
+	@state is not modified. If @check_action_applicability is True and the action is not applicable, the returned state is equal to @state
+	(see Parser.get_next_state()).
+	"""
+	def get_next_state(self, state, action_name, var_assign, check_action_applicability=True):
+		return frozenset(self._get_next_state(state, action_name, var_assign, check_action_applicability))
+
+	# Returns True if @state satisfies all the goals (positive goals must be in @state and negative goals must not be)
+	def is_goal_state(self, state):
+		return all(((pred_name, obj_inds) in state) == is_true for is_true, pred_name, obj_inds in self.goals)
+
+"""
+This class represents a compiled planning task, i.e., the information of a PDDL domain and problem (as obtained by Parser),
+in an immutable form. It is obtained by calling Parser.compile_task().
+
+Unlike Parser, a Task does not store the current state. Instead, its methods receive the state as a parameter (as a set or frozenset of
+atoms, in the same format as Parser.atoms) and never modify it. Since a Task can't be modified either, the same Task can be shared by
+many threads, asyncio tasks or search nodes without copying or locking it.
+
+Example:
+	task = parser.compile_task()
+	state = task.init
+	applicable_actions = task.get_applicable_actions(state)
+	next_state = task.get_next_state(state, 'drive', (44, 15, 12, 1))
+"""
+class Task(_TaskSuccessorGenerator):
+
+	__slots__ = ('domain_name', 'types', 'type_hierarchy', 'predicates', 'constant_names', 'constant_types', 'actions',
+				 'object_names', 'object_types', 'init', 'goals', '_action_schemas')
+
+	"""
+	All the parameters have the same format as the corresponding Parser attributes, except @init, which corresponds to Parser.atoms.
+	They are converted to immutable types (tuples, frozensets and read-only dictionaries).
+	"""
+	def __init__(self, domain_name, types, type_hierarchy, predicates, constant_names, constant_types, actions, object_names,
+				 object_types, init, goals):
+		# Attributes are set with object.__setattr__, since __setattr__ is disabled
+		set_attr = object.__setattr__
+
+		# Domain information
+		set_attr(self, 'domain_name', domain_name)
+		set_attr(self, 'types', frozenset(types))
+		set_attr(self, 'type_hierarchy', MappingProxyType({parent : frozenset(children) for parent, children in type_hierarchy.items()}))
+		set_attr(self, 'predicates', frozenset(predicates))
+		set_attr(self, 'constant_names', tuple(constant_names))
+		set_attr(self, 'constant_types', tuple(constant_types))
+		set_attr(self, 'actions', frozenset(actions))
+
+		# Problem information
+		set_attr(self, 'object_names', tuple(object_names))
+		set_attr(self, 'object_types', tuple(object_types))
+		set_attr(self, 'init', frozenset(init))
+		set_attr(self, 'goals', frozenset(goals))
+
+		# Dictionary which maps each action name to its action schema
+		set_attr(self, '_action_schemas', MappingProxyType({action[0] : action for action in self.actions}))
+
+	def __setattr__(self, name, value):
+		raise AttributeError("Task objects are immutable")
+
+	def __delattr__(self, name):
+		raise AttributeError("Task objects are immutable")
+
+	# Tasks are pickled by their constructor arguments, since __setattr__ is disabled
+	def __reduce__(self):
+		return (Task, (self.domain_name, self.types, dict(self.type_hierarchy), self.predicates, self.constant_names, self.constant_types,
+					   self.actions, self.object_names, self.object_types, self.init, self.goals))
+
+	def __str__(self):
+		return 'Task(domain_name={}, actions={}, objects={}, init atoms={}, goals={})'.format(self.domain_name, len(self.actions),
+			   len(self.object_names), len(self.init), len(self.goals))
@@ -0,0 +1,66 @@
+from collections import OrderedDict
+
+"""
+Class which implements a simple LRU (least recently used) cache on top of an OrderedDict.
+When the cache contains more than @max_size entries, the least recently used entry is evicted.
+It also keeps track of the number of cache hits and misses.
+"""
+class LRUCache:
+
+	def __init__(self, max_size):
+		assert type(max_size) == int and max_size > 0, "@max_size must be a positive integer"
+
+		self.max_size = max_size
+		self.hits = 0
+		self.misses = 0
+		self._entries = OrderedDict()
+
+	def __len__(self):
+		return len(self._entries)
+
+	# Returns the value associated with @key, or None if @key is not in the cache
+	def get(self, key):
+		value = self._entries.get(key)
+
+		if value is None:
+			self.misses += 1
+		else:
+			self.hits += 1
+			self._entries.move_to_end(key) # Mark the entry as the most recently used one
+
+		return value
+
+	def put(self, key, value):
+		self._entries[key] = value
+		self._entries.move_to_end(key)
+
+		if len(self._entries) > self.max_size:
+			self._entries.popitem(last=False) # Evict the least recently used entry
+
+	def clear(self):
+		self._entries.clear()
+		self.hits = 0
+		self.misses = 0
+
+"""
+Auxiliary function used to join the preconditions of an action. It receives the variables @precond_vars of a precondition and the positions
+@key_positions of the variables which are already bound, and returns a tuple (bind_vars, dup_positions):
+	- bind_vars contains tuples (pos, var), meaning that the free variable var is bound to the object at position pos of the matching atom
+	  (its first occurrence in the precondition)
+	- dup_positions contains tuples (pos, first_pos) for the remaining occurrences of the free variables which appear several times in
+	  the precondition, since the matching atom must contain the same object in all those positions
+"""
+def get_bind_vars(precond_vars, key_positions):
+	bind_vars = []
+	dup_positions = []
+	first_positions = dict()
+
+	for pos, var in enumerate(precond_vars):
+		if pos not in key_positions:
+			if var in first_positions:
+				dup_positions.append((pos, first_positions[var]))
+			else:
+				first_positions[var] = pos
+				bind_vars.append((pos, var))
+
+	return bind_vars, dup_positions
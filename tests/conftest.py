@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+# Run the tests against the source tree, without installing the package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+# Domain whose preconditions repeat a variable, e.g. (q ?x ?x), in the join, in a precondition with a bound variable and in the semi-join
+REPEATED_VARS_DOMAIN = '''(define (domain repeated-vars)
+(:requirements :strips :typing :existential-preconditions)
+(:types obj)
+(:predicates (p ?a ?b - obj) (q ?a ?b - obj) (done ?a - obj))
+(:action self-loop :parameters (?x - obj) :precondition (q ?x ?x) :effect (done ?x))
+(:action chain :parameters (?x ?y - obj) :precondition (and (q ?y ?y) (p ?x ?y)) :effect (done ?x))
+(:action loop-witness :parameters (?x - obj) :precondition (exists (?z - obj) (and (p ?x ?z) (q ?z ?z))) :effect (done ?x)))
+'''
+
+REPEATED_VARS_PROBLEM = '''(define (problem repeated-vars) (:domain repeated-vars)
+(:objects o0 o1 o2 o3 - obj)
+(:init (q o0 o0) (q o1 o1) (q o1 o2) (q o2 o1) (q o3 o3) (p o0 o1) (p o2 o2) (p o3 o2))
+(:goal (and (done o0))))
+'''
+
+# Returns the paths (domain_path, problem_path) of the repeated-vars domain and problem, written to a temporary directory
+@pytest.fixture
+def repeated_vars_files(tmp_path):
+	domain_path, problem_path = str(tmp_path / 'domain.pddl'), str(tmp_path / 'problem.pddl')
+
+	with open(domain_path, 'w') as f:
+		f.write(REPEATED_VARS_DOMAIN)
+	with open(problem_path, 'w') as f:
+		f.write(REPEATED_VARS_PROBLEM)
+
+	return domain_path, problem_path
@@ -0,0 +1,90 @@
+import os
+import random
+
+import pytest
+
+from lifted_pddl import GroundActionIndex, Parser
+
+np = pytest.importorskip('numpy')
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lifted_pddl', 'data')
+
+TASK_FILES = [('blocksworld-domain.pddl', 'blocksworld-problem.pddl'), ('logistics-domain-exists.pddl', 'logistics-problem.pddl')]
+
+def get_task(domain_file, problem_file):
+	parser = Parser()
+	parser.parse_domain(os.path.join(DATA_DIR, domain_file))
+	parser.parse_problem(os.path.join(DATA_DIR, problem_file))
+
+	return parser.compile_task()
+
+# Returns the states visited along a random walk of @num_steps steps from the initial state of @task
+def get_random_walk(task, num_steps=15, seed=0):
+	rng = random.Random(seed)
+	states = [task.init]
+
+	for _ in range(num_steps):
+		ground_actions = [(action_name, var_assign) for action_name, var_assigns in task.get_applicable_actions(states[-1]).items() \
+						  for var_assign in var_assigns]
+		if len(ground_actions) == 0:
+			break
+		states.append(task.get_next_state(states[-1], *rng.choice(ground_actions)))
+
+	return states
+
+# Returns the set of ground actions (action_name, var_assign) applicable at @state
+def get_applicable_ground_actions(task, state):
+	return set([(action_name, var_assign) for action_name, var_assigns in task.get_applicable_actions(state).items() for var_assign in var_assigns])
+
+# Returns the set of ground actions whose entries in @mask are True
+def decode_mask(action_index, mask):
+	return set([action_index.get_action(action_id) for action_id in np.flatnonzero(mask)])
+
+@pytest.mark.parametrize('domain_file, problem_file', TASK_FILES)
+@pytest.mark.parametrize('from_reachability', [False, True])
+def test_masks_equal_applicable_actions(domain_file, problem_file, from_reachability):
+	task = get_task(domain_file, problem_file)
+	action_index = GroundActionIndex.from_reachability(task) if from_reachability else GroundActionIndex(task)
+	num_actions = len(action_index)
+	states = get_random_walk(task)
+
+	for state in states:
+		mask = action_index.get_mask(state)
+		assert mask.dtype == bool and mask.shape == (len(action_index),)
+		assert decode_mask(action_index, mask) == get_applicable_ground_actions(task, state)
+
+	# The actions reachable in the delete relaxation contain every applicable action, so the index does not grow
+	assert (len(action_index) == num_actions) == from_reachability
+
+	masks = action_index.get_masks(states)
+	assert masks.shape == (len(states), len(action_index))
+	for state, mask in zip(states, masks):
+		assert decode_mask(action_index, mask) == get_applicable_ground_actions(task, state)
+
+# In the lazy index, the masks of the states obtained in a batch have the length of the index after processing all the states
+def test_lazy_masks_grow():
+	task = get_task('logistics-domain-exists.pddl', 'logistics-problem.pddl')
+	action_index = GroundActionIndex(task)
+	states = get_random_walk(task)
+
+	assert len(action_index) == 0
+	masks = action_index.get_masks(states)
+	assert len(action_index) == len(set().union(*[get_applicable_ground_actions(task, state) for state in states]))
+	assert masks.shape == (len(states), len(action_index))
+	assert not masks[0, len(get_applicable_ground_actions(task, states[0])):].any() # Actions first seen at later states
+
+@pytest.mark.parametrize('from_reachability', [False, True])
+def test_next_states_equal_task_next_states(from_reachability):
+	task = get_task('logistics-domain-exists.pddl', 'logistics-problem.pddl')
+	action_index = GroundActionIndex.from_reachability(task) if from_reachability else GroundActionIndex(task)
+	states = get_random_walk(task)
+	rng = np.random.default_rng(0)
+
+	action_ids = [rng.choice(np.flatnonzero(action_index.get_mask(state))) for state in states]
+	next_states = action_index.get_next_states(states, np.array(action_ids))
+
+	assert len(next_states) == len(states)
+	for state, action_id, next_state in zip(states, action_ids, next_states):
+		expected_next_state = task.get_next_state(state, *action_index.get_action(action_id))
+		assert next_state == expected_next_state == action_index.get_next_state(state, action_id)
+		assert action_index.get_id(*action_index.get_action(action_id)) == action_id
@@ -0,0 +1,94 @@
+import os
+import random
+from itertools import product
+
+import pytest
+
+from lifted_pddl import Parser
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lifted_pddl', 'data')
+
+# Returns two parsers for the same domain and problem: the first one uses the generic successor generator and the second one the generated code
+def get_parsers(domain_path, problem_path):
+	parsers = []
+
+	for compile_actions in (False, True):
+		parser = Parser()
+		parser.parse_domain(domain_path, compile_actions=compile_actions)
+		parser.parse_problem(problem_path)
+		parsers.append(parser)
+
+	assert parsers[1]._compiled_actions is not None and all(checker is not None for checker in parsers[1]._compiled_actions.CHECKERS.values())
+
+	return parsers
+
+# Returns every ground action of @parser (applicable or not), i.e., every assignment of objects of the correct type to the action parameters
+def get_all_ground_actions(parser):
+	ground_actions = []
+
+	for action_name, (action_vars, vars_class), _, _ in sorted(parser.actions):
+		param_objs = [[obj_ind for obj_ind, obj_type in enumerate(parser.object_types) if obj_type in parser.type_hierarchy[var_type]] \
+					  for var_type, var_class in zip(action_vars, vars_class) if var_class == 'param']
+		ground_actions.extend([(action_name, var_assign) for var_assign in product(*param_objs)])
+
+	return ground_actions
+
+# Checks that both parsers return the same applicable actions, applicability and successors at their current state, for the ground actions
+# in @ground_actions. Returns the applicable ground actions
+def check_same_successors(generic_parser, compiled_parser, ground_actions):
+	generic_actions = {action_name : sorted(var_assigns) for action_name, var_assigns in generic_parser.get_applicable_actions().items()}
+	compiled_actions = {action_name : sorted(var_assigns) for action_name, var_assigns in compiled_parser.get_applicable_actions().items()}
+	assert generic_actions == compiled_actions
+
+	applicable_actions = [(action_name, var_assign) for action_name, var_assigns in generic_actions.items() for var_assign in var_assigns]
+
+	for action_name, var_assign in ground_actions + applicable_actions:
+		is_applicable = generic_parser.is_action_applicable(action_name, var_assign)
+		assert compiled_parser.is_action_applicable(action_name, var_assign) == is_applicable
+		assert is_applicable == (tuple(var_assign) in generic_actions[action_name])
+		assert compiled_parser.get_next_state(action_name, var_assign) == generic_parser.get_next_state(action_name, var_assign)
+
+	return sorted(applicable_actions)
+
+# The generated code must be equivalent to the generic successor generator along a random walk, including states with atoms removed
+# (so that negative preconditions and missing witnesses are exercised)
+@pytest.mark.parametrize('domain_file, problem_file', [('blocksworld-domain.pddl', 'blocksworld-problem.pddl'),
+													   ('logistics-domain.pddl', 'logistics-problem.pddl'),
+													   ('logistics-domain-exists.pddl', 'logistics-problem.pddl'),
+													   ('sokoban-domain-no-clear.pddl', 'sokoban-problem.pddl')])
+def test_compiled_actions_equal_generic_successor_generator(domain_file, problem_file):
+	generic_parser, compiled_parser = get_parsers(os.path.join(DATA_DIR, domain_file), os.path.join(DATA_DIR, problem_file))
+	rng = random.Random(0)
+
+	for step in range(30):
+		# Ground actions which are usually not applicable (random objects for each parameter)
+		ground_actions = [(action_name, tuple([rng.randrange(len(generic_parser.object_types)) for _ in range(vars_class.count('param'))])) \
+						  for action_name, (_, vars_class), _, _ in sorted(generic_parser.actions) for _ in range(5)]
+		applicable_actions = check_same_successors(generic_parser, compiled_parser, ground_actions)
+
+		if step % 5 == 4:
+			state = set(generic_parser.atoms)
+			state.discard(rng.choice(sorted(state)))
+		elif len(applicable_actions) > 0:
+			state = generic_parser.get_next_state(*rng.choice(applicable_actions))
+		else:
+			break
+
+		generic_parser.atoms, compiled_parser.atoms = set(state), set(state)
+
+# Repeated variables, e.g. (q ?x ?x), must be matched in the same way by the generated code, checking every ground action
+def test_compiled_actions_with_repeated_variables(repeated_vars_files):
+	generic_parser, compiled_parser = get_parsers(*repeated_vars_files)
+	ground_actions = get_all_ground_actions(generic_parser)
+	init = set(generic_parser.atoms)
+
+	o0, o1, _, o3 = compiled_parser.get_object_indexes(['o0', 'o1', 'o2', 'o3'])
+
+	check_same_successors(generic_parser, compiled_parser, ground_actions)
+	assert sorted([ground_action for ground_action in ground_actions if compiled_parser.is_action_applicable(*ground_action)]) == \
+		   [('chain', (o0, o1)), ('loop-witness', (o0,)), ('self-loop', (o0,)), ('self-loop', (o1,)), ('self-loop', (o3,))]
+
+	# States with a single atom removed
+	for atom in sorted(init):
+		generic_parser.atoms, compiled_parser.atoms = init - {atom}, init - {atom}
+		check_same_successors(generic_parser, compiled_parser, ground_actions)
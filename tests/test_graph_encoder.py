@@ -0,0 +1,91 @@
+import os
+import random
+import weakref
+
+import pytest
+
+from lifted_pddl import Parser, SharedTask, encode_task
+
+np = pytest.importorskip('numpy')
+from lifted_pddl import StateGraphEncoder
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lifted_pddl', 'data')
+
+def get_parser():
+	parser = Parser()
+	parser.parse_domain(os.path.join(DATA_DIR, 'logistics-domain.pddl'))
+	parser.parse_problem(os.path.join(DATA_DIR, 'logistics-problem.pddl'))
+
+	return parser
+
+# Tasks and SharedTasks are encoded in the same way, regardless of the containers used for their attributes
+def test_node_types_of_task_and_shared_task():
+	parser = get_parser()
+	task = parser.compile_task()
+	parser.types = tuple(sorted(parser.types)) # Type names stored in a tuple must not be mistaken for the type ids of a SharedTask
+
+	encoders = [StateGraphEncoder(task), StateGraphEncoder(parser), StateGraphEncoder(SharedTask(encode_task(task)))]
+
+	for encoder in encoders:
+		assert encoder.type_names == encoders[0].type_names
+		assert (encoder.node_types == encoders[0].node_types).all()
+		assert (encoder.node_type_mask == encoders[0].node_type_mask).all()
+
+# Random walk of @num_steps steps from the initial state of @task
+def get_random_walk(task, num_steps=100, seed=0):
+	rng = random.Random(seed)
+	states = [task.init]
+
+	for _ in range(num_steps):
+		ground_actions = sorted([(action_name, var_assign) for action_name, var_assigns in task.get_applicable_actions(states[-1]).items() \
+								 for var_assign in var_assigns])
+		states.append(task.get_next_state(states[-1], *rng.choice(ground_actions)))
+
+	return states
+
+# Frozenset which can be referenced weakly, used to count the states kept alive by the encoder
+class WeakState(frozenset):
+	pass
+
+# States given by a generator must be consumed chunk by chunk (without keeping all of them in memory) and encoded in the same way
+# as a list of states, both in memory and in a directory
+def test_encode_generator_in_chunks(tmp_path):
+	task = get_parser().compile_task()
+	states = get_random_walk(task)
+	encoder = StateGraphEncoder(task)
+	chunk_size = 7
+
+	alive_states = []
+	max_alive_states = [0]
+
+	def generate_states():
+		for state in states:
+			max_alive_states[0] = max(max_alive_states[0], sum([state_ref() is not None for state_ref in alive_states]))
+			weak_state = WeakState(state)
+			alive_states.append(weakref.ref(weak_state))
+			yield weak_state
+
+	expected = encoder.encode(states)
+
+	for directory in (None, str(tmp_path / 'dataset')):
+		alive_states.clear()
+		max_alive_states[0] = 0
+		encoded = encoder.encode(generate_states(), directory, chunk_size=chunk_size)
+		assert max_alive_states[0] <= 2*chunk_size # At most the previous and current chunks
+
+		if directory is not None:
+			assert StateGraphEncoder.load(directory)['goal_mask'].shape == (len(states), len(encoder.goals))
+
+		for name in ('node_types', 'node_type_mask', 'goal_mask'):
+			assert encoded[name].dtype == expected[name].dtype and (encoded[name] == expected[name]).all()
+		for pred_name, pred_arrays in expected['atoms'].items():
+			for array_name, array in pred_arrays.items():
+				encoded_array = encoded['atoms'][pred_name][array_name]
+				assert encoded_array.dtype == array.dtype and encoded_array.shape == array.shape and (encoded_array == array).all()
+
+	# The atoms of each state are in the rows given by the offsets
+	at_arrays = expected['atoms']['at']
+	for state_ind, state in enumerate(states):
+		rows = at_arrays['objects'][at_arrays['offsets'][state_ind]:at_arrays['offsets'][state_ind+1]]
+		assert set([('at', tuple(row)) for row in rows.tolist()]) == set([atom for atom in state if atom[0] == 'at'])
+		assert (at_arrays['state_inds'][at_arrays['offsets'][state_ind]:at_arrays['offsets'][state_ind+1]] == state_ind).all()
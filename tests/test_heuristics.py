@@ -0,0 +1,126 @@
+import os
+import random
+from itertools import product
+
+import pytest
+
+from lifted_pddl import Parser, RelaxedHeuristic
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lifted_pddl', 'data')
+
+# Logistics problem with five packages, two cities (with an airport each), two trucks and an airplane
+LOGISTICS_PROBLEM = '''(define (problem logistics-5) (:domain logistics)
+(:objects c0 c1 - city l0 l1 l2 - location a0 a1 - airport t0 t1 - truck pl - airplane p0 p1 p2 p3 p4 - package)
+(:init (in-city l0 c0) (in-city l1 c0) (in-city a0 c0) (in-city l2 c1) (in-city a1 c1)
+	   (at t0 l0) (at t1 a1) (at pl a0) (at p0 l0) (at p1 l1) (at p2 a0) (at p3 l2) (at p4 a1))
+(:goal (and (at p0 l2) (at p1 l0) (at p2 a1) (at p4 l0))))
+'''
+
+def get_task(domain_path, problem_path):
+	parser = Parser()
+	parser.parse_domain(domain_path)
+	parser.parse_problem(problem_path)
+
+	return parser.compile_task()
+
+# Returns the ground relaxed actions of @task, as tuples (positive_preconds, add_effects), obtained by instantiating the variables of each
+# action schema (including those of existential preconditions) on every object of their type
+def get_relaxed_ground_actions(task):
+	ground_actions = []
+
+	for _, (action_vars, _), preconds, effects in task.actions:
+		var_objs = [[obj_ind for obj_ind, obj_type in enumerate(task.object_types) if obj_type in task.type_hierarchy[var_type]] for var_type in action_vars]
+
+		for var_assign in product(*var_objs):
+			ground_actions.append(([(pred_name, tuple([var_assign[var] for var in precond_vars])) for is_true, pred_name, precond_vars in preconds if is_true],
+								   [(pred_name, tuple([var_assign[var] for var in effect_vars])) for is_add, pred_name, effect_vars in effects if is_add]))
+
+	return ground_actions
+
+# Returns the h_max or h_add value of @state, computed by a Bellman-Ford fixpoint over the ground relaxed actions
+def get_brute_force_heuristic(task, ground_actions, state, heuristic):
+	combine = max if heuristic == 'max' else sum
+	costs = {atom : 0 for atom in state}
+	changed = True
+
+	while changed:
+		changed = False
+
+		for preconds, add_effects in ground_actions:
+			if all(precond in costs for precond in preconds):
+				cost = 1 + combine([costs[precond] for precond in preconds], default=0) if heuristic == 'max' else 1 + sum([costs[precond] for precond in preconds])
+
+				for atom in add_effects:
+					if cost < costs.get(atom, float('inf')):
+						costs[atom] = cost
+						changed = True
+
+	goal_atoms = [(pred_name, obj_inds) for is_true, pred_name, obj_inds in task.goals if is_true]
+	if not all(atom in costs for atom in goal_atoms):
+		return float('inf')
+
+	return combine([costs[atom] for atom in goal_atoms]) if heuristic == 'max' else sum([costs[atom] for atom in goal_atoms])
+
+# Returns True if applying the actions of @relaxed_plan (in any order) in the delete relaxation, starting from @state, achieves the goals
+def is_relaxed_plan(task, relaxed_plan, state):
+	reached_atoms = set(state)
+	remaining_actions = list(relaxed_plan)
+	changed = True
+
+	while changed:
+		changed = False
+
+		for action_name, var_assign in list(remaining_actions):
+			if task.is_action_applicable(frozenset(reached_atoms), action_name, var_assign):
+				reached_atoms.update([atom for atom in task.get_next_state(frozenset(reached_atoms), action_name, var_assign)])
+				remaining_actions.remove((action_name, var_assign))
+				changed = True
+
+	return all((pred_name, obj_inds) in reached_atoms for is_true, pred_name, obj_inds in task.goals if is_true)
+
+@pytest.fixture
+def logistics_task(tmp_path):
+	problem_path = str(tmp_path / 'problem.pddl')
+	with open(problem_path, 'w') as f:
+		f.write(LOGISTICS_PROBLEM)
+
+	return get_task(os.path.join(DATA_DIR, 'logistics-domain.pddl'), problem_path)
+
+# h_max and h_add must be equal to the values computed on the grounded task, at the states of a random walk
+@pytest.mark.parametrize('domain_file', ['logistics-domain.pddl', 'logistics-domain-exists.pddl'])
+def test_heuristics_equal_grounded_heuristics(domain_file, tmp_path):
+	problem_path = str(tmp_path / 'problem.pddl')
+	with open(problem_path, 'w') as f:
+		f.write(LOGISTICS_PROBLEM)
+
+	task = get_task(os.path.join(DATA_DIR, domain_file), problem_path)
+	ground_actions = get_relaxed_ground_actions(task)
+	heuristics = {heuristic : RelaxedHeuristic(task, heuristic) for heuristic in ('max', 'add', 'ff')}
+	rng = random.Random(0)
+	state = task.init
+
+	for _ in range(20):
+		h_max, h_add, h_ff = [heuristics[heuristic](state) for heuristic in ('max', 'add', 'ff')]
+		assert h_max == get_brute_force_heuristic(task, ground_actions, state, 'max')
+		assert h_add == get_brute_force_heuristic(task, ground_actions, state, 'add')
+
+		relaxed_plan = heuristics['ff'].get_relaxed_plan(state)
+		assert h_max <= h_ff <= h_add and h_ff == len(relaxed_plan)
+		assert is_relaxed_plan(task, relaxed_plan, state)
+
+		ground_actions_at_state = sorted([(action_name, var_assign) for action_name, var_assigns in task.get_applicable_actions(state).items() for var_assign in var_assigns])
+		state = task.get_next_state(state, *rng.choice(ground_actions_at_state))
+
+# Heuristic values at the initial state, equal to those of the grounded task (p0 needs 6 sequential steps to reach l2 in h_max)
+def test_heuristic_values_at_init(logistics_task):
+	assert [RelaxedHeuristic(logistics_task, heuristic)(logistics_task.init) for heuristic in ('max', 'add', 'ff')] == [6, 21, 18]
+
+# Unreachable goals result in an infinite heuristic value and no relaxed plan, and repeated states are cached
+def test_unreachable_goals_and_cache(logistics_task):
+	heuristic = RelaxedHeuristic(logistics_task, 'add')
+	state_without_trucks = frozenset([atom for atom in logistics_task.init if atom[0] != 'at' or logistics_task.object_types[atom[1][0]] not in ('truck', 'airplane')])
+
+	assert heuristic(state_without_trucks) == float('inf')
+	assert heuristic.get_relaxed_plan(state_without_trucks) is None
+	heuristic(state_without_trucks)
+	assert heuristic.cache_info()['hits'] == 1 and heuristic.cache_info()['misses'] == 1
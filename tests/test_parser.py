@@ -0,0 +1,242 @@
+import os
+from itertools import product
+
+from lifted_pddl import Parser
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lifted_pddl', 'data')
+
+def get_parser(domain_file, problem_file):
+	parser = Parser()
+	parser.parse_domain(os.path.join(DATA_DIR, domain_file))
+	parser.parse_problem(os.path.join(DATA_DIR, problem_file))
+
+	return parser
+
+# The PDDL output must reflect the objects modified in place (without changing the number of objects) once the fragments are invalidated
+def test_pddl_output_after_modifying_objects_in_place():
+	parser = get_parser('blocksworld-domain.pddl', 'blocksworld-problem.pddl')
+	atom = next(iter(parser.atoms))
+	parser.dump_pddl_problem('problem') # Computes the PDDL fragments
+
+	obj_ind = atom[1][0]
+	parser.object_names[obj_ind] = 'zzz'
+	parser.object_types[obj_ind] = 'object'
+	parser.invalidate_pddl_fragments()
+
+	assert '\tzzz - object\n' in parser.dump_pddl_problem('problem')
+	assert next(iter(parser.encode_atoms_as_pddl([atom], 'tuple')))[1] == 'zzz'
+
+	# Replacing the lists (instead of modifying them in place) does not require invalidating the fragments
+	parser.object_names = parser.object_names[:obj_ind] + ['yyy'] + parser.object_names[obj_ind+1:]
+	assert next(iter(parser.encode_atoms_as_pddl([atom], 'tuple')))[1] == 'yyy'
+
+# Generates a logistics problem with @num_packages packages, where only the first three packages appear in the goal
+def write_logistics_problem(path, num_packages):
+	packages = ['p{}'.format(i) for i in range(num_packages)]
+	problem = '(define (problem big) (:domain logistics)\n' + \
+			  '(:objects c1 - city l1 l2 - location t1 - truck {} - package)\n'.format(' '.join(packages)) + \
+			  '(:init (in-city l1 c1) (in-city l2 c1) (at t1 l1) {})\n'.format(' '.join(['(at {} l1)'.format(p) for p in packages])) + \
+			  '(:goal (and (at p0 l2) (at p1 l2) (at p2 l2))))'
+
+	with open(path, 'w') as f:
+		f.write(problem)
+
+# Symmetry pruning must keep one ground action per class of symmetric actions and, once a state is in the cache, it must not
+# recompute the symmetries of the state (prune_symmetric_actions is only called the first time the state is expanded)
+def test_prune_symmetries_is_cached(tmp_path, monkeypatch):
+	problem_path = str(tmp_path / 'problem.pddl')
+	write_logistics_problem(problem_path, 1500)
+
+	parser = Parser()
+	parser.parse_domain(os.path.join(DATA_DIR, 'logistics-domain.pddl'))
+	parser.parse_problem(problem_path)
+
+	pruned_actions = parser.get_applicable_actions(prune_symmetries=True)
+	assert len(parser.get_applicable_actions()['load']) == 1500
+	# One for the goal packages and one for the rest of packages (the ones with the lowest indexes of their symmetry groups)
+	assert sorted([parser.get_object_name(var_assign[1]) for var_assign in pruned_actions['load']]) == ['p0', 'p3']
+
+	num_calls = [0]
+	prune_symmetric_actions = parser.prune_symmetric_actions
+
+	def counting_prune_symmetric_actions(*args, **kwargs):
+		num_calls[0] += 1
+		return prune_symmetric_actions(*args, **kwargs)
+
+	monkeypatch.setattr(parser, 'prune_symmetric_actions', counting_prune_symmetric_actions)
+	parser.enable_cache()
+
+	for _ in range(3):
+		assert parser.get_applicable_actions(prune_symmetries=True) == pruned_actions
+		assert len(parser.get_applicable_actions()['load']) == 1500
+	assert num_calls[0] == 1
+
+	# A new state is pruned once as well
+	init_atoms = parser.atoms
+	parser.set_current_state(parser.get_next_state('drive', parser.get_object_indexes(['t1', 'l1', 'l2', 'c1'])))
+	parser.get_applicable_actions(prune_symmetries=True)
+	parser.set_current_state(init_atoms)
+	assert parser.get_applicable_actions(prune_symmetries=True) == pruned_actions
+	assert num_calls[0] == 2
+
+# Packages which don't appear in the goals (and the atoms and ground actions they appear in) are irrelevant and must be removed
+def test_prune_irrelevant_removes_objects(tmp_path):
+	problem_path = str(tmp_path / 'problem.pddl')
+	write_logistics_problem(problem_path, 50)
+
+	for domain_file in ('logistics-domain.pddl', 'logistics-domain-exists.pddl'):
+		parser = Parser()
+		parser.parse_domain(os.path.join(DATA_DIR, domain_file))
+		parser.parse_problem(problem_path)
+		pruning_report = parser.prune_irrelevant()
+
+		assert pruning_report['actions'] == ['fly']
+		assert pruning_report['objects'] == ['p{}'.format(i) for i in range(3, 50)]
+		assert set(pruning_report['atoms']) == set([('at', 'p{}'.format(i), 'l1') for i in range(3, 50)])
+		assert sorted(parser.object_names) == ['c1', 'l1', 'l2', 'p0', 'p1', 'p2', 't1']
+		assert sorted(parser.encode_atoms_as_pddl([goal[1:] for goal in parser.goals], 'tuple')) == [('at', 'p0', 'l2'), ('at', 'p1', 'l2'), ('at', 'p2', 'l2')]
+
+# A variable repeated in a precondition must be instantiated on the same object in all its occurrences, and each ground action
+# must be returned only once
+def test_repeated_variables_in_preconditions(repeated_vars_files):
+	parser = Parser()
+	parser.parse_domain(repeated_vars_files[0])
+	parser.parse_problem(repeated_vars_files[1])
+	o0, o1, _, o3 = parser.get_object_indexes(['o0', 'o1', 'o2', 'o3'])
+
+	expected_actions = {'self-loop': [(o0,), (o1,), (o3,)], 'chain': [(o0, o1)], 'loop-witness': [(o0,)]}
+	applicable_actions = parser.get_applicable_actions()
+
+	assert {action_name : sorted(var_assigns) for action_name, var_assigns in applicable_actions.items()} == expected_actions
+	assert {action_name : sorted(var_assigns) for action_name, var_assigns in parser.compile_task().get_applicable_actions(parser.atoms).items()} == expected_actions
+
+# The witnesses of existential preconditions (e.g., the city of drive in logistics-domain-exists.pddl) are only kept if they can be used
+# by some relevant ground action
+def test_prune_irrelevant_existential_witnesses(tmp_path):
+	problem_path = str(tmp_path / 'problem.pddl')
+	with open(problem_path, 'w') as f:
+		f.write('(define (problem two-cities) (:domain logistics)\n' + \
+				'(:objects c1 c2 - city l1 l2 l3 - location t1 t2 - truck p0 p1 - package)\n' + \
+				'(:init (in-city l1 c1) (in-city l2 c1) (in-city l3 c2) (at t1 l1) (at t2 l3) (at p0 l1) (at p1 l3))\n' + \
+				'(:goal (and (at p0 l2))))')
+
+	parser = Parser()
+	parser.parse_domain(os.path.join(DATA_DIR, 'logistics-domain-exists.pddl'))
+	parser.parse_problem(problem_path)
+	pruning_report = parser.prune_irrelevant()
+
+	assert sorted(pruning_report['objects']) == ['c2', 'l3', 'p1', 't2']
+	assert sorted(parser.encode_atoms_as_pddl(parser.atoms, 'tuple')) == [('at', 'p0', 'l1'), ('at', 't1', 'l1'), ('in-city', 'l1', 'c1'), ('in-city', 'l2', 'c1')]
+
+# Returns the actions applicable at @atoms computed without the successor cache
+def get_uncached_applicable_actions(parser, atoms):
+	return parser.compile_task().get_applicable_actions(atoms)
+
+# Cached results must be the same as the uncached ones, and repeated calls at the same state must be cache hits
+def test_successor_cache_hits():
+	parser = get_parser('logistics-domain.pddl', 'logistics-problem.pddl')
+	parser.enable_cache()
+
+	applicable_actions = parser.get_applicable_actions()
+	assert applicable_actions == get_uncached_applicable_actions(parser, parser.atoms)
+	applicable_actions.clear() # Modifying the returned dictionary must not modify the cached entry
+	assert parser.get_applicable_actions() == get_uncached_applicable_actions(parser, parser.atoms)
+
+	action_name = 'drive'
+	var_assign = parser.get_applicable_actions()[action_name][0]
+	next_state = parser.get_next_state(action_name, var_assign)
+	next_state.clear()
+	assert parser.get_next_state(action_name, var_assign) == parser.compile_task().get_next_state(parser.atoms, action_name, var_assign)
+
+	cache_info = parser.cache_info()
+	assert (cache_info['applicable_actions']['hits'], cache_info['applicable_actions']['misses']) == (2, 1)
+	assert (cache_info['next_state']['hits'], cache_info['next_state']['misses']) == (1, 1)
+
+# When the cache is full, the least recently used state must be evicted
+def test_successor_cache_eviction():
+	parser = get_parser('blocksworld-domain.pddl', 'blocksworld-problem.pddl')
+	parser.enable_cache(max_size=2)
+
+	state_a = parser.atoms
+	action_name, var_assigns = next((action_name, var_assigns) for action_name, var_assigns in parser.get_applicable_actions().items() \
+									if len(var_assigns) >= 2)
+	state_b = parser.get_next_state(action_name, var_assigns[0])
+	state_c = parser.get_next_state(action_name, var_assigns[1])
+
+	for state in (state_b, state_a, state_c): # state_a is used more recently than state_b, so state_b is evicted
+		parser.set_current_state(state)
+		parser.get_applicable_actions()
+
+	assert parser.cache_info()['applicable_actions']['size'] == 2
+
+	for state, is_hit in ((state_a, True), (state_c, True), (state_b, False)):
+		hits = parser.cache_info()['applicable_actions']['hits']
+		parser.set_current_state(state)
+		assert parser.get_applicable_actions() == get_uncached_applicable_actions(parser, state)
+		assert (parser.cache_info()['applicable_actions']['hits'] == hits + 1) == is_hit
+
+# The cache must follow the current state, even if self.atoms is modified in place, and it must be cleared when the objects change
+def test_successor_cache_invalidation():
+	parser = get_parser('blocksworld-domain.pddl', 'blocksworld-problem.pddl')
+	parser.enable_cache()
+	parser.get_applicable_actions()
+
+	removed_atom = next(iter(parser.atoms))
+	parser.atoms.remove(removed_atom)
+	assert parser.get_applicable_actions() == get_uncached_applicable_actions(parser, parser.atoms)
+	parser.atoms.add(removed_atom)
+	assert parser.get_applicable_actions() == get_uncached_applicable_actions(parser, parser.atoms)
+	assert parser.cache_info()['applicable_actions']['hits'] == 1
+
+	parser.prune_irrelevant() # Object indexes may change
+	assert parser.cache_info()['applicable_actions'] == {'hits': 0, 'misses': 0, 'size': 0, 'max_size': 10000}
+
+# Returns the actions applicable at @parser.atoms by checking all the preconditions of every grounding in the cartesian product of the
+# objects of each variable (the action schemas can't contain existential preconditions)
+def get_brute_force_applicable_actions(parser):
+	applicable_actions = dict()
+
+	for action_name, (action_vars, _), preconds, _ in parser.actions:
+		var_objs = [[obj_ind for obj_ind, obj_type in enumerate(parser.object_types) if obj_type == var_type] for var_type in action_vars]
+		applicable_actions[action_name] = sorted([var_assign for var_assign in product(*var_objs) \
+												  if all(((pred_name, tuple([var_assign[var] for var in precond_vars])) in parser.atoms) == is_true \
+														 for is_true, pred_name, precond_vars in preconds)])
+
+	return applicable_actions
+
+NEGATIVE_PRECONDS_DOMAIN = '''(define (domain negative-preconds)
+(:requirements :strips :typing :negative-preconditions)
+(:types a b)
+(:predicates (p ?x - a) (r ?x - a ?y - b) (s ?y - b) (t ?x ?z - a))
+(:action act :parameters (?x - a ?y - b ?z - a ?w - b)
+	:precondition (and (p ?x) (not (r ?x ?y)) (not (s ?y)) (not (t ?z ?x)) (not (r ?z ?w)))
+	:effect (s ?y)))
+'''
+
+NEGATIVE_PRECONDS_PROBLEM = '''(define (problem negative-preconds) (:domain negative-preconds)
+(:objects a0 a1 a2 a3 - a b0 b1 b2 - b)
+(:init (p a0) (p a2) (r a0 b0) (r a2 b1) (r a1 b1) (s b2) (t a1 a0) (t a3 a2))
+(:goal (and (s b0))))
+'''
+
+# Negative preconditions over free variables (checked while the free variables are expanded) must obtain the same groundings
+# as expanding all the free variables and then checking the preconditions
+def test_negative_preconditions_over_free_variables(tmp_path):
+	domain_path, problem_path = str(tmp_path / 'domain.pddl'), str(tmp_path / 'problem.pddl')
+	with open(domain_path, 'w') as f:
+		f.write(NEGATIVE_PRECONDS_DOMAIN)
+	with open(problem_path, 'w') as f:
+		f.write(NEGATIVE_PRECONDS_PROBLEM)
+
+	parser = Parser()
+	parser.parse_domain(domain_path)
+	parser.parse_problem(problem_path)
+
+	applicable_actions = {action_name : sorted(var_assigns) for action_name, var_assigns in parser.get_applicable_actions().items()}
+	assert len(applicable_actions['act']) > 0
+	assert applicable_actions == get_brute_force_applicable_actions(parser)
+
+	# The same must hold for a domain without negative preconditions
+	parser = get_parser('blocksworld-domain.pddl', 'blocksworld-problem.pddl')
+	assert {action_name : sorted(var_assigns) for action_name, var_assigns in parser.get_applicable_actions().items()} == \
+		   get_brute_force_applicable_actions(parser)
@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+from lifted_pddl import Parser, SharedTask
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lifted_pddl', 'data')
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+WORKER_SOURCE = """
+import sys
+from lifted_pddl import SharedTask
+
+task = SharedTask.from_shared_memory(sys.argv[1])
+task.get_applicable_actions(task.init)
+task.close()
+"""
+
+def get_task():
+	parser = Parser()
+	parser.parse_domain(os.path.join(DATA_DIR, 'logistics-domain.pddl'))
+	parser.parse_problem(os.path.join(DATA_DIR, 'logistics-problem.pddl'))
+
+	return parser.compile_task()
+
+# A worker started independently which attaches to the block and exits must not unlink it
+def test_worker_exit_does_not_unlink_shared_memory():
+	task = get_task()
+	shm = SharedTask.create_shared_memory(task)
+
+	try:
+		env = dict(os.environ, PYTHONPATH=SRC_DIR)
+		for _ in range(2):
+			subprocess.run([sys.executable, '-c', WORKER_SOURCE, shm.name], env=env, check=True)
+
+		# The block still exists (attaching to it would raise FileNotFoundError otherwise) and contains the task
+		with SharedTask.from_shared_memory(shm.name) as shared_task:
+			assert shared_task.get_applicable_actions(task.init).keys() == task.get_applicable_actions(task.init).keys()
+	finally:
+		shm.close()
+		shm.unlink()
@@ -0,0 +1,75 @@
+import os
+import pickle
+import random
+
+import pytest
+
+from lifted_pddl import Parser
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lifted_pddl', 'data')
+
+TASK_FILES = [('blocksworld-domain.pddl', 'blocksworld-problem.pddl'), ('logistics-domain.pddl', 'logistics-problem.pddl'),
+			  ('logistics-domain-exists.pddl', 'logistics-problem.pddl'), ('sokoban-domain-no-clear.pddl', 'sokoban-problem.pddl')]
+
+def get_parser(domain_file, problem_file):
+	parser = Parser()
+	parser.parse_domain(os.path.join(DATA_DIR, domain_file))
+	parser.parse_problem(os.path.join(DATA_DIR, problem_file))
+
+	return parser
+
+# Attributes of a Task can't be set, deleted or modified, and modifying the parser does not modify the task
+def test_task_is_immutable():
+	parser = get_parser('logistics-domain.pddl', 'logistics-problem.pddl')
+	task = parser.compile_task()
+	init = task.init
+
+	with pytest.raises(AttributeError):
+		task.init = frozenset()
+	with pytest.raises(AttributeError):
+		del task.goals
+	with pytest.raises(TypeError):
+		task.type_hierarchy['object'] = frozenset()
+	with pytest.raises(AttributeError):
+		task.object_names.append('o')
+
+	parser.atoms.clear()
+	parser.object_names[0] = 'zzz'
+	assert task.init == init and len(init) > 0
+	assert task.object_names[0] != 'zzz'
+
+# A pickled task must be equal to the original one and have the same successors
+def test_task_pickling():
+	task = get_parser('logistics-domain-exists.pddl', 'logistics-problem.pddl').compile_task()
+	unpickled_task = pickle.loads(pickle.dumps(task))
+
+	for attr in ('domain_name', 'types', 'predicates', 'constant_names', 'constant_types', 'actions', 'object_names', 'object_types', 'init', 'goals'):
+		assert getattr(unpickled_task, attr) == getattr(task, attr)
+	assert dict(unpickled_task.type_hierarchy) == dict(task.type_hierarchy)
+	assert unpickled_task.get_applicable_actions(task.init) == task.get_applicable_actions(task.init)
+
+# The successors obtained from a Task must be the same as those obtained from the Parser it was compiled from, along a random walk
+@pytest.mark.parametrize('domain_file, problem_file', TASK_FILES)
+def test_task_successors_equal_parser_successors(domain_file, problem_file):
+	parser = get_parser(domain_file, problem_file)
+	task = parser.compile_task()
+	state = task.init
+	rng = random.Random(0)
+
+	for _ in range(20):
+		parser.set_current_state(set(state))
+		applicable_actions = task.get_applicable_actions(state)
+		assert applicable_actions == parser.get_applicable_actions()
+		assert task.is_goal_state(state) == all(((pred_name, obj_inds) in state) == is_true for is_true, pred_name, obj_inds in parser.goals)
+
+		ground_actions = [(action_name, var_assign) for action_name, var_assigns in applicable_actions.items() for var_assign in var_assigns]
+		if len(ground_actions) == 0:
+			break
+
+		action_name, var_assign = rng.choice(ground_actions)
+		assert task.is_action_applicable(state, action_name, var_assign) and parser.is_action_applicable(action_name, var_assign)
+
+		next_state = task.get_next_state(state, action_name, var_assign)
+		assert next_state == frozenset(parser.get_next_state(action_name, var_assign))
+		assert parser.atoms == set(state) # Neither the task nor the parser modify the state
+		state = next_state